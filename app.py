@@ -1,6 +1,6 @@
 from app import create_app
 
-app = create_app()
+app = create_app({"START_BACKGROUND_SERVICES": True})
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
@@ -1,7 +1,10 @@
 import logging
+import os
 
+import click
 from flask import Flask, request
 from flask_jwt_extended import JWTManager
+from jinja2 import FileSystemBytecodeCache
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 from app.blueprints.admin import admin
@@ -16,37 +19,83 @@ from app.blueprints.traveler import traveler
 from app.blueprints.user import user
 from app.blueprints.user.service import is_token_not_valid
 from app.config import Config
-from app.extensions import mail, scheduler, JOB_NOTIFICATION_DAILY_TRAVEL_TRIGGER, JOB_NOTIFICATION_DAILY_TRAVEL_HOUR, \
+from app.encoders import OrjsonProvider
+from app.indexes import ensure_indexes, write_index_report
+from app.pdf import register_font_style
+from app.extensions import mail, mail_dispatcher, mail_outbox, scheduler, JOB_NOTIFICATION_DAILY_TRAVEL_TRIGGER, JOB_NOTIFICATION_DAILY_TRAVEL_HOUR, \
     JOB_NOTIFICATION_DAILY_TRAVEL_MINUTES, JOB_NOTIFICATION_DOCS_REMINDER_TRIGGER, JOB_NOTIFICATION_DOCS_REMINDER_HOUR, \
     JOB_NOTIFICATION_DOCS_REMINDER_MINUTES, redis_auth, mongo, assistant, redis_itinerary, \
-    unsplash, JOB_EVENT_NEWSLETTER_TRIGGER, JOB_EVENT_NEWSLETTER_HOUR, JOB_EVENT_NEWSLETTER_MINUTES
+    unsplash, itinerary_day_executor, generation_executor, redis_assistant, city_meta_cache, \
+    CITY_META_INVALIDATION_CHANNEL, JOB_EVENT_NEWSLETTER_TRIGGER, JOB_EVENT_NEWSLETTER_HOUR, JOB_EVENT_NEWSLETTER_MINUTES, \
+    password_update_cache, PASSWORD_UPDATE_INVALIDATION_CHANNEL, jti_blocklist, JTI_BLOCKLIST_CHANNEL, \
+    redis_scheduler, scheduler_leader, pdf_cache, pdf_render_executor, compressor, \
+    JOB_OUTBOX_EXPIRE_EXHAUSTED_TRIGGER, JOB_OUTBOX_EXPIRE_EXHAUSTED_MINUTES
 from app.response_wrapper import not_found_response, unauthorized_response, error_response
 
 
-def create_app():
+def create_app(config: dict = None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
 
     init_proxy(app)
+    init_json(app)
     init_logging(app)
+    init_templates(app)
     init_blueprints(app)
     init_extensions(app)
     init_jwt_manager(app)
-    init_scheduler(app)
     init_http_interceptors(app)
-    init_app(app)
+    init_cli(app)
+
+    if app.config["BOOTSTRAP_ON_STARTUP"]:
+        init_app(app)
+
+    if app.config["START_BACKGROUND_SERVICES"]:
+        start_background_services(app)
 
     return app
 
+# threads do not survive a fork: with a preloaded app every worker process starts its own services
+def start_background_services(app, scheduler: bool = True):
+    if scheduler:
+        init_scheduler(app)
+
+    init_cache_invalidation(app)
+    init_generation_workers(app)
+    init_outbox_workers(app)
+
+def warm_up(app):
+    register_font_style()
+
+    for template_name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(template_name)
+
+    compressor.compress_static_assets()
+
+    app.logger.info("fonts, templates and static assets loaded!")
+
 def init_proxy(app):
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
 
+def init_json(app):
+    app.json = OrjsonProvider(app)
+
 def init_logging(app):
     logging.basicConfig(
         level=app.config["LOG_LEVEL"],
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
 
+def init_templates(app):
+    # compiled templates are shared on disk by every process, the environment is created on first use
+    os.makedirs(app.config["JINJA_BYTECODE_CACHE_DIR"], exist_ok=True)
+    app.jinja_options = {
+        **app.jinja_options,
+        "bytecode_cache": FileSystemBytecodeCache(app.config["JINJA_BYTECODE_CACHE_DIR"])
+    }
+
 def init_blueprints(app):
     app.register_blueprint(template)
     app.register_blueprint(traveler)
@@ -61,8 +110,21 @@ def init_extensions(app):
     unsplash.init_app(app)
     redis_auth.init_app(app)
     redis_itinerary.init_app(app)
+    redis_assistant.init_app(app)
+    redis_scheduler.init_app(app)
+    scheduler_leader.init_app(app)
     assistant.init_app(app)
+    itinerary_day_executor.init_app(app)
+    generation_executor.init_app(app)
+    city_meta_cache.init_app(app)
+    pdf_cache.init_app(app)
+    pdf_render_executor.init_app(app)
+    password_update_cache.init_app(app)
+    jti_blocklist.init_app(app)
     mail.init_app(app)
+    mail_dispatcher.init_app(app)
+    mail_outbox.init_app(app)
+    compressor.init_app(app)
 
 def init_jwt_manager(app):
     jwt = JWTManager(app)
@@ -77,29 +139,40 @@ def init_jwt_manager(app):
 
 
 def init_scheduler(app):
+    if not app.config["SCHEDULER_ENABLED"]:
+        return
+
+    # every scheduler fires the jobs, only the one elected across processes and containers runs them
+    scheduler_leader.start()
     scheduler.init_app(app)
     scheduler.start()
     scheduler.add_job(
         id="job_daily_travel_schedule",
-        func=job_daily_travel_schedule,
+        func=scheduler_leader.leader_only(job_daily_travel_schedule),
         trigger=JOB_NOTIFICATION_DAILY_TRAVEL_TRIGGER,
         hour=JOB_NOTIFICATION_DAILY_TRAVEL_HOUR,
         minute=JOB_NOTIFICATION_DAILY_TRAVEL_MINUTES
     )
     scheduler.add_job(
         id="job_docs_reminder",
-        func=job_docs_reminder,
+        func=scheduler_leader.leader_only(job_docs_reminder),
         trigger=JOB_NOTIFICATION_DOCS_REMINDER_TRIGGER,
         hour=JOB_NOTIFICATION_DOCS_REMINDER_HOUR,
         minute=JOB_NOTIFICATION_DOCS_REMINDER_MINUTES
     )
     scheduler.add_job(
         id="job_event_newsletter",
-        func=job_event_newsletter,
+        func=scheduler_leader.leader_only(job_event_newsletter),
         trigger=JOB_EVENT_NEWSLETTER_TRIGGER,
         hour=JOB_EVENT_NEWSLETTER_HOUR,
         minute=JOB_EVENT_NEWSLETTER_MINUTES
     )
+    scheduler.add_job(
+        id="job_outbox_expire_exhausted",
+        func=scheduler_leader.leader_only(mail_outbox.expire_exhausted),
+        trigger=JOB_OUTBOX_EXPIRE_EXHAUSTED_TRIGGER,
+        minutes=JOB_OUTBOX_EXPIRE_EXHAUSTED_MINUTES
+    )
 
 def init_http_interceptors(app):
     @app.before_request
@@ -130,6 +203,54 @@ def init_http_interceptors(app):
     def handle_internal_server_error(error):
         return error_response()
 
+def init_cli(app):
+    @app.cli.command("create-indexes")
+    @click.option("--report", default=None, help="Path of the jsonl report listing the indexes in place.")
+    def create_indexes(report):
+        if not ensure_indexes():
+            raise click.ClickException("some indexes could not be created, check the logs")
+
+        if report:
+            write_index_report(report)
+
+    @app.cli.command("bootstrap")
+    def bootstrap():
+        # already run by create_app when bootstrapping on startup
+        if app.config["BOOTSTRAP_ON_STARTUP"]:
+            app.logger.info("admin user, initial config and indexes already created on startup")
+            return
+
+        init_app(app)
+
+    @app.cli.command("compress-static")
+    def compress_static():
+        compressor.compress_static_assets()
+
 def init_app(app):
     create_admin_user(app.config["ADMIN_MAIL"], app.config["ADMIN_PASSWORD"])
     create_initial_config()
+
+    if app.config["MONGO_CREATE_INDEXES_ON_STARTUP"]:
+        ensure_indexes()
+
+def init_cache_invalidation(app):
+    redis_itinerary.subscribe(
+        CITY_META_INVALIDATION_CHANNEL,
+        city_meta_cache.invalidate,
+        on_subscribe=city_meta_cache.clear
+    )
+    redis_auth.subscribe(
+        PASSWORD_UPDATE_INVALIDATION_CHANNEL,
+        password_update_cache.invalidate,
+        on_subscribe=password_update_cache.clear
+    )
+
+    # the filter is rebuilt from redis on every (re)subscription, blacklisted jtis are then synced by message
+    if app.config["JTI_BLOOM_ENABLED"]:
+        redis_auth.subscribe(JTI_BLOCKLIST_CHANNEL, jti_blocklist.handle_message, on_subscribe=jti_blocklist.rebuild)
+
+def init_generation_workers(app):
+    generation_executor.start(app.config["GENERATION_WORKERS"])
+
+def init_outbox_workers(app):
+    mail_outbox.start(app.config["OUTBOX_WORKERS"])
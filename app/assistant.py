@@ -1,11 +1,15 @@
+import json
 import logging
 import re
+import time
 from enum import Enum
+from hashlib import sha256
 
 from flask import Flask
 from openai import OpenAI
 
 from app.exceptions import KeyNotFoundException
+from app.wrappers import RedisWrapper
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +19,9 @@ class ConversationRole(Enum):
     SYSTEM = "system"
 
 class Conversation:
-    def __init__(self, response_format: type):
+    def __init__(self, response_format: type, cacheable: bool = False):
         self.response_format = response_format
+        self.cacheable = cacheable
         self.messages = []
 
     def add_message(self, role, content):
@@ -34,6 +39,12 @@ class Conversation:
             'content': self.encode(element["content"])
         })
 
+    def copy(self, response_format: type = None):
+        conversation = Conversation(response_format or self.response_format, self.cacheable)
+        conversation.messages = list(self.messages)
+
+        return conversation
+
     @staticmethod
     def create_message(role, content):
         return {
@@ -45,15 +56,155 @@ class Conversation:
     def encode(content: str):
         return re.sub(r'\s+', ' ', content).strip()
 
+class AssistantCache:
+    RESPONSE_KEY_PREFIX = "assistant-response:"
+    RECENCY_KEY = "assistant-responses-recency"
+    HITS_KEY = "assistant-cache-hits"
+    MISSES_KEY = "assistant-cache-misses"
+
+    def __init__(self, redis: RedisWrapper):
+        self.redis = redis
+        self.enabled = False
+        self.ttl = None
+        self.max_entries = None
+
+    def init_app(self, app: Flask):
+        self.enabled = app.config["ASSISTANT_CACHE_ENABLED"]
+        self.ttl = app.config["ASSISTANT_CACHE_TTL_SECONDS"]
+        self.max_entries = app.config["ASSISTANT_CACHE_MAX_ENTRIES"]
+
+    @staticmethod
+    def build_key(conversation: Conversation) -> str:
+        normalized = json.dumps(
+            {"response_format": conversation.response_format.__name__, "messages": conversation.messages},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+
+        return sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, conversation: Conversation):
+        key = self.build_key(conversation)
+        client = self.redis.get_client()
+        cached_response = client.get(self.RESPONSE_KEY_PREFIX + key)
+
+        if cached_response is None:
+            client.incr(self.MISSES_KEY)
+            return None
+
+        # a hit keeps the response alive as long as the recency entry
+        pipeline = client.pipeline(transaction=False)
+        pipeline.incr(self.HITS_KEY)
+        pipeline.expire(self.RESPONSE_KEY_PREFIX + key, self.ttl)
+        pipeline.zadd(self.RECENCY_KEY, {key: time.time()})
+        pipeline.execute()
+
+        return conversation.response_format.model_validate_json(cached_response)
+
+    def put(self, conversation: Conversation, response):
+        key = self.build_key(conversation)
+        now = time.time()
+
+        pipeline = self.redis.get_client().pipeline(transaction=False)
+        pipeline.set(self.RESPONSE_KEY_PREFIX + key, response.model_dump_json(), ex=self.ttl)
+        pipeline.zadd(self.RECENCY_KEY, {key: now})
+        pipeline.zremrangebyscore(self.RECENCY_KEY, 0, now - self.ttl)
+        pipeline.execute()
+
+        self.evict()
+
+    def invalidate(self, conversation: Conversation):
+        key = self.build_key(conversation)
+
+        pipeline = self.redis.get_client().pipeline(transaction=False)
+        pipeline.delete(self.RESPONSE_KEY_PREFIX + key)
+        pipeline.zrem(self.RECENCY_KEY, key)
+        pipeline.execute()
+
+    def evict(self):
+        client = self.redis.get_client()
+        overflow = client.zcard(self.RECENCY_KEY) - self.max_entries
+
+        if overflow <= 0:
+            return
+
+        # least recently used responses are the ones with the lowest score
+        evicted = client.zpopmin(self.RECENCY_KEY, overflow)
+        client.delete(*[self.RESPONSE_KEY_PREFIX + key for key, _ in evicted])
+        logger.info("evicted %d assistant responses from cache", len(evicted))
+
+    def stats(self) -> dict:
+        client = self.redis.get_client()
+        hits = int(client.get(self.HITS_KEY) or 0)
+        misses = int(client.get(self.MISSES_KEY) or 0)
+
+        return {
+            "entries": client.zcard(self.RECENCY_KEY),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses > 0 else 0
+        }
+
 class Assistant:
-    def __init__(self):
+    def __init__(self, cache: AssistantCache = None):
         self.client = OpenAI()
         self.openai_model = None
+        self.cache = cache
 
     def init_app(self, app: Flask):
         self.openai_model = app.config["OPENAI_MODEL"]
 
-    def ask(self, conversation: Conversation):
+        if self.cache:
+            self.cache.init_app(app)
+
+    # validate raises when the caller cannot use the response: rejected responses are never cached
+    def ask(self, conversation: Conversation, validate=None):
+        use_cache = self.cache is not None and self.cache.enabled and conversation.cacheable
+
+        if use_cache:
+            cached_response = self.get_cached(conversation, validate)
+            if cached_response is not None:
+                logger.info("assistant answered from cache")
+                return cached_response
+
+        parsed_response = self.ask_model(conversation)
+
+        if parsed_response is not None and validate:
+            validate(parsed_response)
+
+        if use_cache and parsed_response is not None:
+            try:
+                self.cache.put(conversation, parsed_response)
+            except Exception as err:
+                logger.warning("cannot write assistant cache: %s", str(err))
+
+        return parsed_response
+
+    def get_cached(self, conversation: Conversation, validate=None):
+        try:
+            cached_response = self.cache.get(conversation)
+        except Exception as err:
+            logger.warning("cannot read assistant cache: %s", str(err))
+            return None
+
+        if cached_response is None or not validate:
+            return cached_response
+
+        try:
+            validate(cached_response)
+            return cached_response
+        except Exception as err:
+            # stored before responses were validated, it is asked again
+            logger.warning("dropping cached assistant response: %s", str(err))
+
+        try:
+            self.cache.invalidate(conversation)
+        except Exception as err:
+            logger.warning("cannot invalidate assistant cache: %s", str(err))
+
+        return None
+
+    def ask_model(self, conversation: Conversation):
         completion = self.client.beta.chat.completions.parse(
             model=self.openai_model,
             messages=conversation.messages,
@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from flask import Flask
+
+from app.wrappers import RedisWrapper
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+# blacklisted jtis are kept in one filter per expiry bucket: once every token of a bucket
+# is expired its filter is dropped, so the filters never grow with revoked tokens
+class JtiBlocklistFilter:
+    def __init__(self, redis: RedisWrapper):
+        self.redis = redis
+        self.enabled = False
+        self.capacity = None
+        self.error_rate = None
+        self.bucket_seconds = None
+        self.generations: dict[int, BloomFilter] = {}
+        self.ready = False
+        self.pending = None
+        self.lock = threading.Lock()
+        self.negatives = 0
+        self.positives = 0
+        self.false_positives = 0
+
+    def init_app(self, app: Flask):
+        self.enabled = app.config["JTI_BLOOM_ENABLED"]
+        self.capacity = app.config["JTI_BLOOM_CAPACITY"]
+        self.error_rate = app.config["JTI_BLOOM_ERROR_RATE"]
+        self.bucket_seconds = app.config["JTI_BLOOM_BUCKET_SECONDS"]
+
+    def get_bucket(self, expires_at: float) -> int:
+        return int(expires_at // self.bucket_seconds)
+
+    def add_to(self, generations: dict[int, BloomFilter], jti: str, expires_at: float):
+        bucket = self.get_bucket(expires_at)
+
+        if bucket not in generations:
+            generations[bucket] = BloomFilter(self.capacity, self.error_rate)
+
+        generations[bucket].add(jti)
+
+    def add(self, jti: str, expires_at: float):
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.add_to(self.generations, jti, expires_at)
+
+            if self.pending is not None:
+                self.pending.append((jti, expires_at))
+
+    def rotate(self, now: float):
+        expired = [bucket for bucket in self.generations if (bucket + 1) * self.bucket_seconds < now]
+
+        for bucket in expired:
+            del self.generations[bucket]
+
+    def might_contain(self, jti: str) -> bool:
+        # until the first rebuild every check falls through to redis
+        if not self.enabled or not self.ready:
+            return True
+
+        with self.lock:
+            self.rotate(time.time())
+
+            if any(jti in generation for generation in self.generations.values()):
+                self.positives += 1
+                return True
+
+            self.negatives += 1
+            return False
+
+    def record_false_positive(self):
+        with self.lock:
+            self.false_positives += 1
+
+    @staticmethod
+    def build_message(jti: str, expires_at: float) -> str:
+        return f"{jti} {expires_at}"
+
+    def handle_message(self, message: str):
+        jti, expires_at = message.split(" ")
+        self.add(jti, float(expires_at))
+
+    def rebuild(self):
+        if not self.enabled:
+            return
+
+        logger.info("rebuilding jti blocklist filter..")
+        # jtis added while scanning are replayed on the rebuilt filter
+        with self.lock:
+            self.pending = []
+
+        client = self.redis.get_client()
+        generations = {}
+        now = time.time()
+        keys = []
+
+        def add_batch():
+            pipeline = client.pipeline(transaction=False)
+            for key in keys:
+                pipeline.ttl(key)
+
+            for key, ttl in zip(keys, pipeline.execute()):
+                if ttl > 0:
+                    self.add_to(generations, key, now + ttl)
+
+            keys.clear()
+
+        # blacklisted jtis are stored as plain keys, prefixed keys belong to other features
+        for key in client.scan_iter(count=1000):
+            if ":" in key:
+                continue
+
+            keys.append(key)
+            if len(keys) >= 1000:
+                add_batch()
+
+        add_batch()
+
+        with self.lock:
+            for jti, expires_at in self.pending:
+                self.add_to(generations, jti, expires_at)
+
+            self.generations = generations
+            self.pending = None
+            self.ready = True
+
+        logger.info("jti blocklist filter rebuilt with %d generations!", len(generations))
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "ready": self.ready,
+                "generations": len(self.generations),
+                "items": sum(generation.count for generation in self.generations.values()),
+                "negatives": self.negatives,
+                "positives": self.positives,
+                "false_positives": self.false_positives,
+                "false_positive_rate": self.false_positives / (self.negatives + self.false_positives)
+                    if self.negatives + self.false_positives > 0 else 0
+            }
@@ -5,8 +5,9 @@ from pydantic import ValidationError
 
 from app.blueprints.admin import admin
 from app.blueprints.admin.model import ItineraryActivationRequest
-from app.blueprints.admin.service import handle_itinerary_activation
-from app.response_wrapper import bad_request_response, no_content_response
+from app.blueprints.admin.service import handle_itinerary_activation, get_metrics
+from app.response_wrapper import bad_request_response, no_content_response, success_response, error_response
+from app.role import roles_required, Role
 
 logger = logging.getLogger(__name__)
 
@@ -18,4 +19,13 @@ def itinerary_activation():
         return no_content_response()
     except ValidationError as err:
         logger.error("validation error while parsing itinerary activation request")
-        return bad_request_response(err.errors())
\ No newline at end of file
+        return bad_request_response(err.errors())
+
+@admin.get('/metrics')
+@roles_required([Role.ADMIN.name])
+def metrics():
+    try:
+        return success_response(get_metrics())
+    except Exception as err:
+        logger.error(str(err))
+        return error_response()
\ No newline at end of file
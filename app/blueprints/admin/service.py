@@ -2,7 +2,8 @@ import logging
 
 from app.blueprints.admin.model import ItineraryActivationRequest, Config
 from app.blueprints.user.service import create_user, exists_admin
-from app.extensions import mongo
+from app.extensions import mongo, assistant_cache, city_meta_cache, password_update_cache, jti_blocklist, mail_outbox, \
+    pdf_cache
 from app.models import Collections
 from app.role import Role
 
@@ -40,4 +41,15 @@ def handle_itinerary_activation(itinerary_activation_req: ItineraryActivationReq
         {},
         {'$set': {"is_itinerary_active": itinerary_activation_req.is_itinerary_active}}
     )
-    logger.info("updated is_itinerary_active value!")
\ No newline at end of file
+    logger.info("updated is_itinerary_active value!")
+
+def get_metrics() -> dict:
+    return {
+        "assistant_cache": assistant_cache.stats(),
+        "city_meta_cache": city_meta_cache.stats(),
+        "pagination_total_cache": mongo.totals.stats(),
+        "pdf_cache": pdf_cache.stats(),
+        "password_update_cache": password_update_cache.stats(),
+        "jti_blocklist_filter": jti_blocklist.stats(),
+        "mail_outbox": mail_outbox.stats()
+    }
\ No newline at end of file
@@ -1,22 +1,48 @@
 import logging
+from typing import Optional
 
-from app.blueprints.event.mail import send_newsletter
+from app.blueprints.event.mail import build_newsletter, render_newsletter_events, get_newsletter_base_link
 from app.blueprints.event.service import get_events_allow_to_newsletter
-from app.blueprints.traveler.service import get_all_travelers
-from app.blueprints.user.service import get_user_by_id
+from app.blueprints.traveler.service import iter_travelers_to_newsletter
+from app.blueprints.user.service import find_emails_by_user_ids
 from app.exceptions import ElementNotFoundException
+from app.extensions import JOB_RECIPIENTS_BATCH_SIZE, mail_dispatcher
 
 logger = logging.getLogger(__name__)
 
+def get_newsletter_events_html(events_by_interests: dict, interested_in: list[str], base_link: str) -> Optional[str]:
+    # travelers sharing the same interests get the same events, retrieved and rendered once per combination
+    interests = frozenset(interested_in)
+
+    if interests not in events_by_interests:
+        try:
+            events = get_events_allow_to_newsletter(sorted(interests))
+            events_by_interests[interests] = render_newsletter_events(events, base_link)
+        except ElementNotFoundException:
+            events_by_interests[interests] = None
+
+    return events_by_interests[interests]
+
 def job_event_newsletter():
-    try:
-        travelers = get_all_travelers()
-        for traveler in travelers:
-            user = get_user_by_id(traveler.user_id)
-            if len(traveler.interested_in) > 0:
-                events = get_events_allow_to_newsletter(traveler.interested_in)
-                send_newsletter(email=user.email,traveler=traveler,events=events)
-
-    except ElementNotFoundException as err:
-        logger.error(str(err))
-        logger.error("no notifications to send.")
\ No newline at end of file
+    events_by_interests = {}
+    base_link = get_newsletter_base_link()
+    queued_newsletters = 0
+
+    with mail_dispatcher.batch() as batch:
+        for travelers in iter_travelers_to_newsletter(JOB_RECIPIENTS_BATCH_SIZE):
+            emails = find_emails_by_user_ids([traveler.user_id for traveler in travelers])
+
+            for traveler in travelers:
+                email = emails.get(traveler.user_id)
+                if not email:
+                    logger.warning("no email found for traveler with user id %s", traveler.user_id)
+                    continue
+
+                events_html = get_newsletter_events_html(events_by_interests, traveler.interested_in, base_link)
+                if not events_html:
+                    continue
+
+                batch.add(build_newsletter(email=email, traveler=traveler, events_html=events_html))
+                queued_newsletters += 1
+
+    logger.info("queued %d newsletters for %d interest combinations", queued_newsletters, len(events_by_interests))
@@ -3,20 +3,28 @@ from datetime import date
 from flask import render_template, url_for
 from flask_mailman import EmailMessage
 
-from app.extensions import scheduler
+from app.extensions import mail_dispatcher
 from app.blueprints.event.model import EventNewsletter
 from app.blueprints.traveler.model import Traveler
 
 
-def send_newsletter(email:str,
-                    traveler: Traveler,
-                    events: list[EventNewsletter]):
-    with scheduler.app.app_context():
+def get_newsletter_base_link() -> str:
+    with mail_dispatcher.app.app_context():
+        return url_for("template.generate_itinerary", _external=True)
+
+def render_newsletter_events(events: list[EventNewsletter], base_link: str) -> str:
+    with mail_dispatcher.app.app_context():
+        return render_template("newsletter_events.html", base_link = base_link, events = events)
+
+def build_newsletter(email:str,
+                     traveler: Traveler,
+                     events_html: str) -> EmailMessage:
+    # the events section is rendered once per interests, only the envelope is rendered per traveler
+    with mail_dispatcher.app.app_context():
         html_content = render_template(
             "newsletter.html",
-            base_link = url_for("template.generate_itinerary", _external=True),
             traveler = traveler,
-            events=events,
+            events_html = events_html,
             year = date.today().year
         )
         message = EmailMessage(
@@ -25,4 +33,4 @@ def send_newsletter(email:str,
             body=html_content
         )
         message.content_subtype = "html"
-        message.send()
\ No newline at end of file
+        return message
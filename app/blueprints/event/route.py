@@ -7,11 +7,12 @@ from pydantic import ValidationError
 from app.blueprints.event import event
 from app.blueprints.event.model import UpdateEventRequest, CreateEventRequest
 from app.blueprints.event.service import create_event, update_event, delete_event, search_events, \
-    get_event_by_user_and_id, get_upcoming_events, get_other_events, get_past_events, get_events_stats, get_event_by_id
+    get_upcoming_events, get_other_events, get_past_events, get_events_stats, get_event_by_id, \
+    search_events_by_cursor, get_event_etag, get_event_etag_by_user_and_id
 from app.exceptions import ElementNotFoundException, OrganizationNotActiveException
-from app.models import Paginated
+from app.models import Paginated, CursorPaginated
 from app.response_wrapper import bad_request_response, error_response, success_response, no_content_response, \
-    not_found_response, forbidden_response
+    not_found_response, forbidden_response, is_not_modified, not_modified_response
 from app.role import roles_required, Role
 
 logger = logging.getLogger(__name__)
@@ -20,8 +21,12 @@ logger = logging.getLogger(__name__)
 @roles_required([Role.ORGANIZATION.name])
 def get(event_id):
     try:
-        event = get_event_by_user_and_id(get_jwt_identity(), event_id)
-        return success_response(event.model_dump())
+        etag = get_event_etag_by_user_and_id(get_jwt_identity(), event_id)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        event = get_event_by_id(event_id)
+        return success_response(event, etag=etag)
     except ElementNotFoundException as err:
         logger.warning(str(err))
         return not_found_response(err.message)
@@ -35,8 +40,12 @@ def get(event_id):
 @roles_required([Role.TRAVELER.name])
 def get_for_itinerary(event_id):
     try:
+        etag = get_event_etag(event_id)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
         event = get_event_by_id(event_id)
-        return success_response(event.model_dump())
+        return success_response(event, etag=etag)
     except ElementNotFoundException as err:
         logger.warning(str(err))
         return not_found_response(err.message)
@@ -106,7 +115,7 @@ def search():
         paginated = Paginated(**request.json)
         events = search_events(get_jwt_identity(), paginated)
 
-        return success_response(events.model_dump())
+        return success_response(events)
     except ValidationError as err:
         logger.error("validation error while parsing search events request", err)
         return bad_request_response(err.errors())
@@ -116,6 +125,23 @@ def search():
         logger.error(str(err))
         return error_response()
 
+@event.post('/search/cursor')
+@roles_required([Role.ORGANIZATION.name])
+def search_by_cursor():
+    try:
+        cursor_paginated = CursorPaginated(**request.json)
+        events = search_events_by_cursor(get_jwt_identity(), cursor_paginated)
+
+        return success_response(events)
+    except ValidationError as err:
+        logger.error("validation error while parsing search events by cursor request: %s", err)
+        return bad_request_response(err.errors())
+    except OrganizationNotActiveException as err:
+        return forbidden_response(err.message)
+    except Exception as err:
+        logger.error(str(err))
+        return error_response()
+
 @event.post('/upcoming')
 @roles_required([Role.ORGANIZATION.name])
 def upcoming():
@@ -123,7 +149,7 @@ def upcoming():
         paginated = Paginated(**request.json)
         events = get_upcoming_events(get_jwt_identity(), paginated)
 
-        return success_response(events.model_dump())
+        return success_response(events)
     except ValidationError as err:
         logger.error("validation error while parsing upcoming events request", err)
         return bad_request_response(err.errors())
@@ -165,7 +191,7 @@ def past():
 def stats():
     try:
         event_stats = get_events_stats(get_jwt_identity())
-        return success_response(event_stats.model_dump())
+        return success_response(event_stats)
     except OrganizationNotActiveException as err:
         return forbidden_response(err.message)
     except Exception as err:
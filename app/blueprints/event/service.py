@@ -1,5 +1,6 @@
 import logging
 from datetime import datetime, timezone
+from typing import Optional
 
 from bson import ObjectId
 
@@ -10,10 +11,13 @@ from app.blueprints.organization.service import is_organization_active, \
     get_organization_by_user_id
 from app.exceptions import ElementNotFoundException, OrganizationNotActiveException
 from app.extensions import mongo
-from app.models import Paginated, PaginatedResponse, Collections
+from app.models import Paginated, PaginatedResponse, Collections, CursorPaginated, CursorPaginatedResponse
+from app.utils import build_etag
 
 logger = logging.getLogger(__name__)
 
+VERSION_PROJECTION = {"updated_at": 1, "created_at": 1}
+
 def get_event_by_id(event_id: str) -> Event:
     logger.info("retrieving event with id %s", event_id)
     event_document = mongo.find_one(Collections.EVENTS, {'_id': ObjectId(event_id)})
@@ -38,6 +42,21 @@ def get_event_by_user_and_id(user_id: str, event_id: str) -> Event:
     logger.info("found event with id %s!", event_id)
     return Event(**event_document)
 
+def get_event_etag(event_id: str) -> Optional[str]:
+    event_document = mongo.find_one(Collections.EVENTS, {'_id': ObjectId(event_id)}, VERSION_PROJECTION)
+
+    if event_document is None:
+        raise ElementNotFoundException(f"no event found with id {event_id}")
+
+    version = event_document.get("updated_at") or event_document.get("created_at")
+    return build_etag(event_id, version) if version else None
+
+def get_event_etag_by_user_and_id(user_id: str, event_id: str) -> Optional[str]:
+    if not is_organization_active(user_id):
+        raise OrganizationNotActiveException()
+
+    return get_event_etag(event_id)
+
 def create_event(user_id: str, request: CreateEventRequest):
     logger.info("storing event..")
 
@@ -87,25 +106,13 @@ def delete_event(user_id: str, event_id: str):
     logger.info("deleted itinerary with id %s!", event_id)
 
 def search_events(user_id: str, paginated: Paginated) -> PaginatedResponse:
-    found_events = []
-    filters = {"user_id": user_id}
-
     logger.info("searching for events for user with id %s..", user_id)
 
     if not is_organization_active(user_id):
         raise OrganizationNotActiveException()
 
-    cursor = mongo.aggregate(
-        Collections.EVENTS,
-        filters,
-        [{"$sort": {"created_at": -1}},
-        {"$skip": paginated.elements_to_skip},
-        {"$limit": paginated.page_size}]
-    )
-    total_events = mongo.count_documents(Collections.EVENTS, filters)
-
-    for ev in list(cursor):
-        found_events.append(Event(**ev).model_dump())
+    events, total_events = mongo.paginate(Collections.EVENTS, {"user_id": user_id}, [], paginated)
+    found_events = [Event(**ev).model_dump() for ev in events]
 
     logger.info("found %d events for user with id %s!", len(found_events), user_id)
 
@@ -116,28 +123,39 @@ def search_events(user_id: str, paginated: Paginated) -> PaginatedResponse:
         page_number=paginated.page_number
     )
 
+def search_events_by_cursor(user_id: str, cursor_paginated: CursorPaginated) -> CursorPaginatedResponse:
+    logger.info("searching for events by cursor for user with id %s..", user_id)
+
+    if not is_organization_active(user_id):
+        raise OrganizationNotActiveException()
+
+    events, next_cursor = mongo.aggregate_by_cursor(Collections.EVENTS, {"user_id": user_id}, [], cursor_paginated)
+    found_events = [Event(**ev).model_dump() for ev in events]
+
+    logger.info("found %d events by cursor for user with id %s!", len(found_events), user_id)
+
+    return CursorPaginatedResponse(
+        content=found_events,
+        page_size=cursor_paginated.page_size,
+        next_cursor=next_cursor
+    )
+
 def get_upcoming_events(user_id: str, paginated: Paginated) -> PaginatedResponse:
     found_events = []
-    filters = {"user_id": user_id}
 
     logger.info("searching for upcoming events for user with id %s..", user_id)
 
     if not is_organization_active(user_id):
         raise OrganizationNotActiveException()
 
-    cursor = mongo.aggregate(
+    events, total_events = mongo.paginate(
         Collections.EVENTS,
-        filters,
-        [
-            {"$sort": {"created_at": -1}},
-            {"$project": { "start_date": 1, "end_date": 1, "title": 1 }},
-            {"$skip": paginated.elements_to_skip},
-            {"$limit": paginated.page_size}
-        ]
+        {"user_id": user_id},
+        [{"$project": { "start_date": 1, "end_date": 1, "title": 1 }}],
+        paginated
     )
-    total_events = mongo.count_documents(Collections.EVENTS, filters)
 
-    for ev in list(cursor):
+    for ev in events:
         found_events.append(
             UpcomingEvent(
                 id=str(ev.get("_id")),
@@ -5,14 +5,14 @@ from flask_mailman import EmailMessage
 
 from app.blueprints.itinerary.model import Itinerary, AssistantItinerary, AssistantItineraryDocs
 from app.blueprints.traveler.model import Traveler
-from app.extensions import scheduler
+from app.extensions import mail_dispatcher, mail_outbox
 
 
-def send_travel_schedule(email: str,
-                         traveler: Traveler,
-                         itinerary: Itinerary,
-                         day_detail: AssistantItinerary):
-    with scheduler.app.app_context():
+def build_travel_schedule(email: str,
+                          traveler: Traveler,
+                          itinerary: Itinerary,
+                          day_detail: AssistantItinerary) -> EmailMessage:
+    with mail_dispatcher.app.app_context():
         html_content = render_template(
             "daily_travel_schedule.html",
             city = itinerary.city,
@@ -29,13 +29,13 @@ def send_travel_schedule(email: str,
             body = html_content
         )
         message.content_subtype = "html"
-        message.send()
+        return message
 
-def send_docs_reminder(email: str,
-                       traveler: Traveler,
-                       city: str,
-                       docs: AssistantItineraryDocs):
-    with scheduler.app.app_context():
+def build_docs_reminder(email: str,
+                        traveler: Traveler,
+                        city: str,
+                        docs: AssistantItineraryDocs) -> EmailMessage:
+    with mail_dispatcher.app.app_context():
         html_content = render_template(
             "docs_reminder.html",
             city = city,
@@ -50,4 +50,10 @@ def send_docs_reminder(email: str,
             body = html_content
         )
         message.content_subtype = "html"
-        message.send()
\ No newline at end of file
+        return message
+
+def send_docs_reminder(email: str,
+                       traveler: Traveler,
+                       city: str,
+                       docs: AssistantItineraryDocs):
+    mail_outbox.enqueue(build_docs_reminder(email, traveler, city, docs))
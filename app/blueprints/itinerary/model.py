@@ -1,3 +1,4 @@
+import hashlib
 import logging
 from datetime import datetime
 from enum import Enum
@@ -7,7 +8,7 @@ from pydantic import BaseModel, Field, model_validator, computed_field
 from typing_extensions import Self
 
 from app.encoders import PyObjectId
-from app.models import Paginated, Coordinates, Activity, UnsplashImage
+from app.models import Paginated, CursorPaginated, Coordinates, Activity, UnsplashImage
 from app.utils import is_valid_enum_name, encode_city_name
 
 COLLECTION_NAME = "itineraries"
@@ -22,6 +23,11 @@ class CannotUpdateItineraryException(Exception):
         super().__init__(message)
         self.message = message
 
+class ExportNotReadyException(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
 class DateNotValidException(Exception):
     def __init__(self, message):
         super().__init__(message)
@@ -42,11 +48,21 @@ class ItineraryRequestStatus(Enum):
     COMPLETED = "completed"
     ERROR = "error"
 
+class ItineraryGenerationMode(Enum):
+    SEQUENTIAL = "sequential"
+    PARALLEL = "parallel"
+
 class ItineraryStatus(Enum):
     PENDING = "pending"
     READY = "ready"
     COMPLETED = "completed"
 
+class ItineraryExportStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    ERROR = "error"
+
 class TravellingWith(Enum):
     NONE = "none"
     SOLO = "solo"
@@ -68,7 +84,7 @@ class Budget(Enum):
     def max(self):
         return self.value[1]
 
-class ItinerarySearch(Paginated):
+class ItinerarySearchFilters(BaseModel):
     city: str = ""
     budget: str = Budget.NONE.name
     interested_in: list[str] = []
@@ -107,6 +123,7 @@ class ItinerarySearch(Paginated):
 
         return self
 
+class ItinerarySearch(ItinerarySearchFilters, Paginated):
     @staticmethod
     def from_request(interested_in: str, city: str, travelling_with: str, budget: str):
         values = {}
@@ -121,6 +138,9 @@ class ItinerarySearch(Paginated):
 
         return ItinerarySearch(**values)
 
+class CursorItinerarySearch(ItinerarySearchFilters, CursorPaginated):
+    pass
+
 class ItinerarySearchResponse(BaseModel):
     id: str
     city: str
@@ -170,6 +190,25 @@ class AssistantItinerary(BaseModel):
 class AssistantItineraryResponse(BaseModel):
     itinerary: list[AssistantItinerary]
 
+class ItineraryPdf(BaseModel):
+    city: str
+    start_date: datetime
+    end_date: datetime
+    details: list[AssistantItinerary] = []
+
+    # changes whenever a field printed in the pdf changes
+    def get_version(self, layout_version: int) -> str:
+        content = f"{layout_version}:{self.model_dump_json()}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+class AssistantItinerarySkeletonDay(BaseModel):
+    day: int
+    title: str
+    theme: str
+
+class AssistantItinerarySkeletonResponse(BaseModel):
+    skeleton: list[AssistantItinerarySkeletonDay]
+
 class CityMetaRequest(BaseModel):
     name: str
 
@@ -192,6 +231,14 @@ class AssistantItineraryDocs(BaseModel):
 class AssistantItineraryDocsResponse(BaseModel):
     docs: list[AssistantItineraryDocs]
 
+class ItineraryDocs(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    key: str
+    month: int
+    docs: AssistantItineraryDocs
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
 class ItineraryBaseModel(BaseModel):
     @model_validator(mode='before')
     def check_enums(self) -> Self:
@@ -373,10 +420,10 @@ class CityMeta(BaseModel):
     image: UnsplashImage
 
     @staticmethod
-    def from_sources(image: UnsplashImage, city_description: CityDescription):
+    def from_sources(image: UnsplashImage, city_description: CityDescription, key: str = None):
         return CityMeta(
             name=city_description.name,
-            key=encode_city_name(city_description.name),
+            key=key or encode_city_name(city_description.name),
             country=city_description.country,
             coordinates=Coordinates(lat=city_description.lat, lng=city_description.lng),
             description=city_description.description,
@@ -481,4 +528,33 @@ class ItineraryRequestDetail(BaseModel):
 
 class ItineraryMetaDetail(BaseModel):
     is_owner: bool = False
-    has_saved: bool = False
\ No newline at end of file
+    has_saved: bool = False
+
+class ItineraryExportRequest(BaseModel):
+    user_id: Optional[PyObjectId] = None
+    city: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+    @model_validator(mode='after')
+    def check_filters(self) -> Self:
+        if not self.user_id and not self.city and not self.start_date and not self.end_date:
+            raise ValueError('No filter provided, at least one should not be empty!')
+
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValueError('start_date cannot be after end_date!')
+
+        return self
+
+class ItineraryExport(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    requested_by: PyObjectId
+    filters: ItineraryExportRequest
+    status: str = ItineraryExportStatus.PENDING.name
+    total: int = 0
+    processed: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
@@ -8,17 +8,21 @@ from pydantic import ValidationError
 from app.blueprints.itinerary import itinerary
 from app.blueprints.itinerary.model import ItineraryRequest, ShareWithRequest, PublishReqeust, DuplicateRequest, \
     ItinerarySearch, DateNotValidException, UpdateItineraryRequest, CannotUpdateItineraryException, \
-    ItineraryGenerationDisabledException, CityMetaRequest, SharedWithResponse
+    ItineraryGenerationDisabledException, CityMetaRequest, SharedWithResponse, CursorItinerarySearch, \
+    ItineraryExportRequest, ExportNotReadyException
 from app.blueprints.itinerary.service import get_itinerary_request_by_id, \
     get_itinerary_by_id, create_itinerary, share_with, publish, completed, duplicate, update_itinerary, \
     search_itineraries, get_completed_itineraries, get_shared_itineraries, download_itinerary, delete_itinerary, \
     get_saved_itineraries, handle_itinerary_request, handle_event_itinerary_request, handle_save_itinerary, \
     get_most_saved, get_itinerary_meta_detail, find_city_meta, get_upcoming_itineraries, get_past_itineraries, \
-    get_shared_with, remove_shared_with
-from app.exceptions import ElementNotFoundException
-from app.models import Paginated
+    get_shared_with, remove_shared_with, search_itineraries_by_cursor, get_saved_itineraries_by_cursor, \
+    get_shared_itineraries_by_cursor, request_itinerary_export, get_itinerary_export, get_itinerary_export_file, \
+    get_itinerary_etag, get_city_meta_etag, get_most_saved_ranking, get_most_saved_etag
+from app.exceptions import ElementNotFoundException, GenerationQueueFullException
+from app.models import Paginated, CursorPaginated
 from app.response_wrapper import success_response, bad_gateway_response, error_response, bad_request_response, \
-    no_content_response, not_found_response, service_unavailable_response
+    no_content_response, not_found_response, service_unavailable_response, too_many_requests_response, \
+    conflict_response, is_not_modified, not_modified_response
 from app.role import roles_required, Role
 
 logger = logging.getLogger(__name__)
@@ -26,8 +30,12 @@ logger = logging.getLogger(__name__)
 @itinerary.get('/<itinerary_id>')
 def get_itinerary(itinerary_id):
     try:
+        etag = get_itinerary_etag(itinerary_id)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
         itinerary = get_itinerary_by_id(itinerary_id)
-        return success_response(itinerary.model_dump())
+        return success_response(itinerary, etag=etag)
     except ElementNotFoundException as err:
         logger.warning(str(err))
         return not_found_response(err.message)
@@ -85,14 +93,63 @@ def delete(itinerary_id):
 @itinerary.get("/download/<itinerary_id>")
 def download(itinerary_id):
     try:
-        pdf_file = download_itinerary(itinerary_id)
+        pdf_file, version = download_itinerary(itinerary_id)
+        # conditional requests matching the etag get a 304 without the pdf
         return send_file(pdf_file,
                          as_attachment=True,
                          download_name="itinerary.pdf",
-                         mimetype="application/pdf")
+                         mimetype="application/pdf",
+                         etag=version,
+                         max_age=0)
+    except ElementNotFoundException as err:
+        logger.warning(str(err))
+        return not_found_response(err.message)
+    except Exception as err:
+        logger.error(str(err))
+        return error_response()
+
+@itinerary.post('/export')
+@roles_required([Role.ADMIN.name])
+def export():
+    try:
+        export_id = request_itinerary_export(get_jwt_identity(), ItineraryExportRequest(**request.json))
+        return success_response({"id": export_id}, 202)
+    except ValidationError as err:
+        logger.error("validation error while parsing itinerary export request: %s", err)
+        return bad_request_response(err.errors(include_context=False))
+    except GenerationQueueFullException as err:
+        logger.warning(err.message)
+        return too_many_requests_response(err.message)
+    except Exception as err:
+        logger.error(str(err))
+        return error_response()
+
+@itinerary.get('/export/<export_id>')
+@roles_required([Role.ADMIN.name])
+def export_status(export_id):
+    try:
+        return success_response(get_itinerary_export(export_id))
+    except ElementNotFoundException as err:
+        logger.warning(str(err))
+        return not_found_response(err.message)
+    except Exception as err:
+        logger.error(str(err))
+        return error_response()
+
+@itinerary.get('/export/<export_id>/download')
+@roles_required([Role.ADMIN.name])
+def export_download(export_id):
+    try:
+        return send_file(get_itinerary_export_file(export_id),
+                         as_attachment=True,
+                         download_name=f"itineraries-{export_id}.zip",
+                         mimetype="application/zip")
     except ElementNotFoundException as err:
         logger.warning(str(err))
         return not_found_response(err.message)
+    except ExportNotReadyException as err:
+        logger.warning(err.message)
+        return conflict_response(err.message)
     except Exception as err:
         logger.error(str(err))
         return error_response()
@@ -104,7 +161,7 @@ def search():
         itinerary_search = ItinerarySearch(**request.json)
         itineraries = search_itineraries(get_jwt_identity(), itinerary_search)
 
-        return success_response(itineraries.model_dump())
+        return success_response(itineraries)
     except ValidationError as err:
         logger.error("validation error while parsing share itinerary with request", err)
         return bad_request_response(err.errors(include_context=False))
@@ -112,6 +169,21 @@ def search():
         logger.error(str(err))
         return error_response()
 
+@itinerary.post('/search/cursor')
+@roles_required([Role.TRAVELER.name])
+def search_by_cursor():
+    try:
+        itinerary_search = CursorItinerarySearch(**request.json)
+        itineraries = search_itineraries_by_cursor(get_jwt_identity(), itinerary_search)
+
+        return success_response(itineraries)
+    except ValidationError as err:
+        logger.error("validation error while parsing search itineraries by cursor request: %s", err)
+        return bad_request_response(err.errors(include_context=False))
+    except Exception as err:
+        logger.error(str(err))
+        return error_response()
+
 @itinerary.get('/completed')
 @roles_required([Role.TRAVELER.name])
 def completed_itineraries():
@@ -138,7 +210,22 @@ def saved_itineraries():
     try:
         paginated = Paginated(**request.json)
         itineraries = get_saved_itineraries(get_jwt_identity(), paginated)
-        return success_response(itineraries.model_dump())
+        return success_response(itineraries)
+    except Exception as err:
+        logger.error(str(err))
+        return error_response()
+
+@itinerary.post('/saved/cursor')
+@roles_required([Role.TRAVELER.name])
+def saved_itineraries_by_cursor():
+    try:
+        cursor_paginated = CursorPaginated(**request.json)
+        itineraries = get_saved_itineraries_by_cursor(get_jwt_identity(), cursor_paginated)
+
+        return success_response(itineraries)
+    except ValidationError as err:
+        logger.error("validation error while parsing saved itineraries by cursor request: %s", err)
+        return bad_request_response(err.errors(include_context=False))
     except Exception as err:
         logger.error(str(err))
         return error_response()
@@ -150,7 +237,7 @@ def shared_itineraries():
         paginated = Paginated(**request.json)
         itineraries = get_shared_itineraries(get_jwt_identity(), paginated)
 
-        return success_response(itineraries.model_dump())
+        return success_response(itineraries)
     except ValidationError as err:
         logger.error("validation error while parsing shared itineraries reqeust", err)
         return bad_request_response(err.errors(include_context=False))
@@ -158,6 +245,21 @@ def shared_itineraries():
         logger.error(str(err))
         return error_response()
 
+@itinerary.post('/shared/cursor')
+@roles_required([Role.TRAVELER.name])
+def shared_itineraries_by_cursor():
+    try:
+        cursor_paginated = CursorPaginated(**request.json)
+        itineraries = get_shared_itineraries_by_cursor(get_jwt_identity(), cursor_paginated)
+
+        return success_response(itineraries)
+    except ValidationError as err:
+        logger.error("validation error while parsing shared itineraries by cursor request: %s", err)
+        return bad_request_response(err.errors(include_context=False))
+    except Exception as err:
+        logger.error(str(err))
+        return error_response()
+
 @itinerary.post('/share-with')
 @roles_required([Role.TRAVELER.name])
 def share_itinerary_with():
@@ -261,7 +363,7 @@ def city_description():
         if not meta:
             return no_content_response()
 
-        return success_response(meta.model_dump())
+        return success_response(meta)
     except APIStatusError as err:
         logger.error(str(err))
         return bad_gateway_response()
@@ -269,6 +371,23 @@ def city_description():
         logger.error(str(err))
         return error_response()
 
+@itinerary.get('/city-meta/<name>')
+def city_description_by_name(name):
+    try:
+        meta = find_city_meta(name)
+
+        if not meta:
+            return no_content_response()
+
+        etag = get_city_meta_etag(meta)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        return success_response(meta, etag=etag)
+    except Exception as err:
+        logger.error(str(err))
+        return error_response()
+
 @itinerary.post('/request')
 @roles_required([Role.TRAVELER.name])
 def generate_itinerary():
@@ -286,6 +405,9 @@ def generate_itinerary():
     except ItineraryGenerationDisabledException as err:
         logger.error(err.message)
         return service_unavailable_response()
+    except GenerationQueueFullException as err:
+        logger.warning(err.message)
+        return too_many_requests_response(err.message)
     except Exception as err:
         logger.error(str(err))
         return error_response()
@@ -306,7 +428,10 @@ def generate_event_itinerary(event_id):
         return bad_request_response(err.message)
     except ItineraryGenerationDisabledException as err:
         logger.error(err.message)
-
+        return service_unavailable_response()
+    except GenerationQueueFullException as err:
+        logger.warning(err.message)
+        return too_many_requests_response(err.message)
     except Exception as err:
         logger.error(str(err))
         return error_response()
@@ -315,7 +440,7 @@ def generate_event_itinerary(event_id):
 def get_itinerary_request(request_id):
     try:
         itinerary_request = get_itinerary_request_by_id(request_id)
-        return success_response(itinerary_request.model_dump())
+        return success_response(itinerary_request)
     except ElementNotFoundException as err:
         logger.warning(str(err))
         return not_found_response(err.message)
@@ -326,8 +451,12 @@ def get_itinerary_request(request_id):
 @itinerary.get('/most-saved')
 def most_saved():
     try:
-        spotlight_itineraries = get_most_saved()
-        return success_response(spotlight_itineraries)
+        most_saved = get_most_saved_ranking()
+        etag = get_most_saved_etag(most_saved)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        return success_response(get_most_saved(most_saved), etag=etag)
     except Exception as err:
         logger.error(str(err))
         return error_response()
@@ -337,7 +466,7 @@ def most_saved():
 def itinerary_meta_detail(itinerary_id):
     try:
         meta_detail = get_itinerary_meta_detail(get_jwt_identity(), itinerary_id)
-        return success_response(meta_detail.model_dump())
+        return success_response(meta_detail)
     except Exception as err:
         logger.error(str(err))
         return error_response()
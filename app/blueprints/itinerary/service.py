@@ -1,9 +1,17 @@
 import logging
-import threading
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
 from datetime import datetime, timezone, timedelta, date, time
 from io import BytesIO
+from itertools import islice
+from multiprocessing import get_context
+from typing import Optional, Iterable, Iterator, BinaryIO
 
 from bson import ObjectId
+from flask import current_app
+from pymongo.errors import DuplicateKeyError
 
 from app.assistant import Conversation, ConversationRole
 from app.blueprints.admin.service import can_generate_itinerary
@@ -16,29 +24,79 @@ from app.blueprints.itinerary.model import CityDescription, AssistantItineraryRe
     UpdateItineraryRequest, CannotUpdateItineraryException, ItineraryGenerationDisabledException, DocsNotFoundException, \
     AssistantItineraryDocsResponse, CityMetaRequest, CityMeta, SpotlightItinerary, ItinerarySearchResponse, \
     ItineraryDetail, ItineraryMetaDetail, ItineraryRequestDetail, UpcomingItinerary, PastItinerary, SavedItinerary, \
-    SharedWithResponse
-from app.blueprints.traveler.service import get_traveler_by_user_id
+    SharedWithResponse, ItineraryGenerationMode, AssistantItinerarySkeletonResponse, AssistantItinerarySkeletonDay, \
+    AssistantItinerary, AssistantItineraryDocs, ItineraryDocs, ItinerarySearchFilters, CursorItinerarySearch, \
+    ItineraryPdf, ItineraryExport, ItineraryExportRequest, ItineraryExportStatus, ExportNotReadyException
+from app.blueprints.traveler.model import Traveler
+from app.blueprints.traveler.service import get_traveler_by_user_id, find_travelers_by_user_ids
 from app.blueprints.user.service import get_user_by_id, find_users_emails_by_ids, get_user_by_email, \
-    find_users_ids_by_emails
+    find_users_ids_by_emails, find_emails_by_user_ids
 from app.exceptions import ElementNotFoundException
 from app.extensions import mongo, assistant, ITINERARY_RETRIEVE_DOCS_PROMPT, unsplash, redis_itinerary, \
     CITY_DESCRIPTION_SYSTEM_INSTRUCTIONS, CITY_DESCRIPTION_USER_PROMPT, ITINERARY_USER_PROMPT, \
     ITINERARY_USER_EVENT_PROMPT, ITINERARY_SYSTEM_INSTRUCTIONS, ITINERARY_DAILY_PROMPT, \
-    JOB_NOTIFICATION_DOCS_REMINDER_DAYS_BEFORE_START_DATE, MOST_SAVED_ITINERARIES_KEY
-from app.models import PaginatedResponse, Paginated, Collections, UnsplashImage
-from app.pdf import PdfItinerary
-from app.utils import encode_city_name
+    JOB_NOTIFICATION_DOCS_REMINDER_DAYS_BEFORE_START_DATE, MOST_SAVED_ITINERARIES_KEY, ITINERARY_SKELETON_PROMPT, \
+    ITINERARY_SKELETON_DAILY_PROMPT, ITINERARY_GENERATION_DAY_ATTEMPTS, itinerary_day_executor, generation_executor, \
+    city_meta_cache, CITY_META_INVALIDATION_CHANNEL, JOB_RECIPIENTS_BATCH_SIZE, pdf_cache, \
+    pdf_render_executor
+from app.models import PaginatedResponse, Paginated, Collections, UnsplashImage, CursorPaginated, \
+    CursorPaginatedResponse
+from app.pdf import render_itinerary, render_itinerary_bytes, LAYOUT_VERSION
+from app.utils import encode_city_name, build_etag, normalize_city_name
 
 logger = logging.getLogger(__name__)
 
+# created_at is needed to sort and to build the next cursor
+SEARCH_PROJECTION = {"city": 1, "start_date": 1, "end_date": 1, "interested_in": 1, "travelling_with": 1, "budget": 1, "created_at": 1}
+SAVED_PROJECTION = {"city": 1, "start_date": 1, "end_date": 1, "interested_in": 1, "created_at": 1}
+PDF_PROJECTION = {"city": 1, "start_date": 1, "end_date": 1, "details": 1}
+VERSION_PROJECTION = {"update_at": 1, "created_at": 1}
+EXPORT_BATCH_SIZE = 100
+EXPORT_PROGRESS_INTERVAL = 20
+
 
 def find_city_meta(city: str):
-    city_meta = mongo.find_one(Collections.CITY_METAS, {"key": encode_city_name(city)})
+    key = encode_city_name(city)
+    city_meta = city_meta_cache.get(key)
+
+    if city_meta:
+        return city_meta
 
-    if not city_meta:
+    city_meta_document = mongo.find_one(Collections.CITY_METAS, {"key": key})
+
+    if not city_meta_document:
         return None
 
-    return CityMeta(**city_meta)
+    city_meta = CityMeta(**city_meta_document)
+    city_meta_cache.set(key, city_meta)
+
+    return city_meta
+
+def find_city_metas(cities: list[str]) -> dict[str, CityMeta]:
+    keys = {encode_city_name(city) for city in cities}
+    city_metas = city_meta_cache.get_many(keys)
+    missing_keys = list(keys - city_metas.keys())
+
+    if not missing_keys:
+        return city_metas
+
+    for city_meta_document in mongo.find(Collections.CITY_METAS, {"key": {"$in": missing_keys}}):
+        city_meta = CityMeta(**city_meta_document)
+        city_metas[city_meta.key] = city_meta
+        city_meta_cache.set(city_meta.key, city_meta)
+
+    return city_metas
+
+# city metas are inserted once and never updated
+def get_city_meta_etag(city_meta: CityMeta) -> str:
+    return build_etag(city_meta.id, city_meta.key)
+
+def invalidate_city_meta(key: str):
+    city_meta_cache.invalidate(key)
+    redis_itinerary.publish(CITY_META_INVALIDATION_CHANNEL, key)
+
+def get_city_meta(city_metas: dict[str, CityMeta], city: str) -> CityMeta:
+    return city_metas.get(encode_city_name(city))
 
 def exists_by_id(itinerary_id: str):
     return mongo.exists(Collections.ITINERARIES, {"_id": ObjectId(itinerary_id)})
@@ -53,6 +111,15 @@ def get_itinerary_by_id(itinerary_id) -> Itinerary:
     logger.info("found itinerary with id %s", itinerary_id)
     return Itinerary(**itinerary_document)
 
+def get_itinerary_etag(itinerary_id: str) -> Optional[str]:
+    itinerary_document = mongo.find_one(Collections.ITINERARIES, {'_id': ObjectId(itinerary_id)}, VERSION_PROJECTION)
+
+    if itinerary_document is None:
+        raise ElementNotFoundException(f"no itinerary found with id {itinerary_id}")
+
+    version = itinerary_document.get("update_at") or itinerary_document.get("created_at")
+    return build_etag(itinerary_id, version) if version else None
+
 def get_itinerary_detail(itinerary_id: str) -> Itinerary:
     logger.info("retrieving itinerary detail with id %s", itinerary_id)
     itinerary_document = mongo.find_one(Collections.ITINERARIES, {'_id': ObjectId(itinerary_id)}, { 'docs': 0 })
@@ -119,6 +186,26 @@ def get_itineraries_allow_to_docs_reminder() -> list[Itinerary]:
     logger.info("found %d itineraries allow to docs reminder", len(found_itineraries))
     return found_itineraries
 
+def iter_itinerary_recipients(itineraries: Iterable[Itinerary],
+                              batch_size: int = JOB_RECIPIENTS_BATCH_SIZE) -> Iterator[tuple[Itinerary, Traveler, str]]:
+    itineraries = iter(itineraries)
+
+    # travelers and emails of a whole batch are resolved with two $in queries
+    while batch := list(islice(itineraries, batch_size)):
+        user_ids = list({itinerary.user_id for itinerary in batch})
+        travelers = find_travelers_by_user_ids(user_ids)
+        emails = find_emails_by_user_ids(user_ids)
+
+        for itinerary in batch:
+            traveler = travelers.get(itinerary.user_id)
+            email = emails.get(itinerary.user_id)
+
+            if not traveler or not email:
+                logger.warning("no recipient found for itinerary with id %s", itinerary.id)
+                continue
+
+            yield itinerary, traveler, email
+
 def create_itinerary(itinerary_request_id: str) -> str:
     logger.info("storing itinerary..")
     stored_itinerary_request = mongo.find_one(Collections.ITINERARY_REQUESTS, {'_id': ObjectId(itinerary_request_id)})
@@ -135,25 +222,71 @@ def create_itinerary(itinerary_request_id: str) -> str:
     mongo.delete_one(Collections.ITINERARY_REQUESTS, {'_id': ObjectId(itinerary_request_id)})
     logger.info("itinerary stored successfully with id %s", result.inserted_id)
 
-    threading.Thread(target=ask_itinerary_docs, args=(itinerary.city, result.inserted_id, itinerary.user_id, itinerary.start_date)).start()
+    generation_executor.submit(
+        "ask_itinerary_docs",
+        admission=False,
+        city=itinerary.city,
+        itinerary_id=result.inserted_id,
+        user_id=itinerary.user_id,
+        start_date=itinerary.start_date
+    )
     return str(result.inserted_id)
 
 def save_itinerary_meta(itinerary_id):
     itinerary_meta = ItineraryMeta(itinerary_id=itinerary_id)
     mongo.insert_one(Collections.ITINERARY_METAS, itinerary_meta.model_dump(exclude={'id'}))
 
+@generation_executor.task("ask_itinerary_docs")
 def ask_itinerary_docs(city: str,
                        itinerary_id: id,
                        user_id: str,
                        start_date: datetime):
     logger.info("starting retrieve docs...")
 
+    docs = get_itinerary_docs(city, start_date.month)
+
+    mongo.update_one(
+        Collections.ITINERARIES,
+        {"_id": itinerary_id},
+        {"$set": {"docs": docs.model_dump(), "update_at": datetime.now(timezone.utc)}}
+    )
+
+    traveler = get_traveler_by_user_id(user_id)
+    user = get_user_by_id(user_id)
+    send_docs_reminder(email = user.email,
+                       traveler = traveler,
+                       city = city,
+                       docs = docs)
+
+def get_itinerary_docs(city: str, month: int) -> AssistantItineraryDocs:
+    key = encode_city_name(city)
+    refreshed_after = datetime.now(timezone.utc) - timedelta(days=current_app.config["ITINERARY_DOCS_REFRESH_DAYS"])
+
+    return redis_itinerary.single_flight(
+        f"itinerary-docs:{key}:{month}",
+        lambda: find_itinerary_docs(key, month, refreshed_after),
+        lambda: retrieve_itinerary_docs(city, month)
+    )
+
+def find_itinerary_docs(key: str, month: int, refreshed_after: datetime) -> Optional[AssistantItineraryDocs]:
+    itinerary_docs = mongo.find_one(
+        Collections.ITINERARY_DOCS,
+        {"key": key, "month": month, "updated_at": {"$gte": refreshed_after}}
+    )
+
+    if not itinerary_docs:
+        return None
+
+    logger.info("found docs for city %s in month %d", key, month)
+    return ItineraryDocs(**itinerary_docs).docs
+
+def retrieve_itinerary_docs(city: str, month: int) -> AssistantItineraryDocs:
     conversation = Conversation(AssistantItineraryDocsResponse)
     conversation.add_message(
         ConversationRole.USER.value,
         ITINERARY_RETRIEVE_DOCS_PROMPT.format(
-            city = city,
-            month = start_date.month
+            city = normalize_city_name(city),
+            month = month
         )
     )
 
@@ -163,18 +296,19 @@ def ask_itinerary_docs(city: str,
     if docs_response is None:
         raise DocsNotFoundException("Docs not found.")
 
+    now = datetime.now(timezone.utc)
     mongo.update_one(
-        Collections.ITINERARIES,
-        {"_id": itinerary_id},
-        {"$set": {"docs": docs_response.docs[0].model_dump()}}
+        Collections.ITINERARY_DOCS,
+        {"key": encode_city_name(city), "month": month},
+        {
+            "$set": {"docs": docs_response.docs[0].model_dump(), "updated_at": now},
+            "$setOnInsert": {"created_at": now}
+        },
+        upsert=True
     )
+    logger.info("stored docs for city %s in month %d", city, month)
 
-    traveler = get_traveler_by_user_id(user_id)
-    user = get_user_by_id(user_id)
-    send_docs_reminder(email = user.email,
-                       traveler = traveler,
-                       city = city,
-                       docs = docs_response.docs[0])
+    return docs_response.docs[0]
 
 
 def update_itinerary(itinerary_id: str, updated_itinerary_req: UpdateItineraryRequest):
@@ -192,33 +326,31 @@ def update_itinerary(itinerary_id: str, updated_itinerary_req: UpdateItineraryRe
     mongo.update_one(
         Collections.ITINERARIES,
         {'_id': ObjectId(itinerary_id)},
-        {"$set": updated_itinerary_req.model_dump(exclude={'id'})}
+        {"$set": {**updated_itinerary_req.model_dump(exclude={'id'}), "update_at": stored_itinerary.update_at}}
     )
+    invalidate_itinerary_pdf(itinerary_id)
 
     logger.info("updated itinerary with id %s", itinerary_id)
 
 def delete_itinerary(itinerary_id: str):
     logger.info("deleting itinerary with id %s", itinerary_id)
 
+    now = datetime.now(timezone.utc)
     result = mongo.update_one(
         Collections.ITINERARIES,
         {"_id": ObjectId(itinerary_id)},
-        {"$set": {"deleted_at": datetime.now(timezone.utc)}}
+        {"$set": {"deleted_at": now, "update_at": now}}
     )
 
     if result.matched_count == 0:
         raise ElementNotFoundException(f"no itinerary found with id {itinerary_id}!")
 
+    invalidate_itinerary_pdf(itinerary_id)
     logger.info("deleted itinerary with id %s!", itinerary_id)
 
-def search_itineraries(user_id: str, itinerary_search: ItinerarySearch) -> PaginatedResponse:
-    aggregations = []
-    filters = {"user_id": {"$ne": user_id}}
-    found_itineraries = []
-
-    logger.info("searching for itineraries..")
+def build_search_filters(user_id: str, itinerary_search: ItinerarySearchFilters) -> dict:
+    filters = {"user_id": {"$ne": user_id}, "is_public": True}
 
-    filters["is_public"] = True
     if itinerary_search.city:
         filters["city"] = itinerary_search.city
     if Budget[itinerary_search.budget] != Budget.NONE:
@@ -228,16 +360,14 @@ def search_itineraries(user_id: str, itinerary_search: ItinerarySearch) -> Pagin
     if itinerary_search.interested_in:
         filters["interested_in"] = {"$in": itinerary_search.interested_in}
 
-    aggregations.append({"$project": {"city": 1, "start_date": 1, "end_date": 1, "interested_in": 1, "travelling_with": 1, "budget": 1}})
-    aggregations.append({"$sort": {"created_at": -1}})
-    aggregations.append({"$skip": itinerary_search.elements_to_skip})
-    aggregations.append({"$limit": itinerary_search.page_size})
+    return filters
 
-    cursor = mongo.aggregate(Collections.ITINERARIES, filters, aggregations)
-    total_itineraries = mongo.count_documents(Collections.ITINERARIES, filters)
+def to_search_responses(itineraries: list[dict]) -> list[dict]:
+    found_itineraries = []
+    city_metas = find_city_metas([itinerary.get("city") for itinerary in itineraries])
 
-    for itinerary in list(cursor):
-        city_meta = find_city_meta(itinerary.get("city"))
+    for itinerary in itineraries:
+        city_meta = get_city_meta(city_metas, itinerary.get("city"))
         found_itineraries.append(
             ItinerarySearchResponse(
                 id=str(itinerary.get("_id")),
@@ -253,6 +383,21 @@ def search_itineraries(user_id: str, itinerary_search: ItinerarySearch) -> Pagin
             ).model_dump()
         )
 
+    return found_itineraries
+
+def search_itineraries(user_id: str, itinerary_search: ItinerarySearch) -> PaginatedResponse:
+    logger.info("searching for itineraries..")
+
+    # public itineraries change slowly, a short-lived total spares the count on every page
+    itineraries, total_itineraries = mongo.paginate(
+        Collections.ITINERARIES,
+        build_search_filters(user_id, itinerary_search),
+        [{"$project": SEARCH_PROJECTION}],
+        itinerary_search,
+        cache_total=True
+    )
+    found_itineraries = to_search_responses(itineraries)
+
     logger.info("found %d itineraries!", len(found_itineraries))
 
     return PaginatedResponse(
@@ -262,6 +407,25 @@ def search_itineraries(user_id: str, itinerary_search: ItinerarySearch) -> Pagin
         page_number=itinerary_search.page_number
     )
 
+def search_itineraries_by_cursor(user_id: str, itinerary_search: CursorItinerarySearch) -> CursorPaginatedResponse:
+    logger.info("searching for itineraries by cursor..")
+
+    itineraries, next_cursor = mongo.aggregate_by_cursor(
+        Collections.ITINERARIES,
+        build_search_filters(user_id, itinerary_search),
+        [{"$project": SEARCH_PROJECTION}],
+        itinerary_search
+    )
+    found_itineraries = to_search_responses(itineraries)
+
+    logger.info("found %d itineraries by cursor!", len(found_itineraries))
+
+    return CursorPaginatedResponse(
+        content=found_itineraries,
+        page_size=itinerary_search.page_size,
+        next_cursor=next_cursor
+    )
+
 def get_completed_itineraries(user_id: str) -> list:
     found_itineraries = []
 
@@ -292,30 +456,16 @@ def get_completed_itineraries(user_id: str) -> list:
 
     return found_itineraries
 
-def get_saved_itineraries(user_id: str, paginated: Paginated) -> PaginatedResponse:
-    found_itineraries = []
-
-    logger.info("searching for saved itineraries by user with id %s..", user_id)
-
+def find_saved_itinerary_ids(user_id: str) -> list[ObjectId]:
     cursor = mongo.find(Collections.ITINERARY_METAS, {"saved_by": user_id}, {"itinerary_id": 1})
-    saved_itineraries = [ObjectId(it["itinerary_id"]) for it in list(cursor)]
-
-    filters = {"_id": {"$in": saved_itineraries}}
+    return [ObjectId(it["itinerary_id"]) for it in list(cursor)]
 
-    logger.info(filters)
-
-    cursor = mongo.aggregate(
-        Collections.ITINERARIES,
-        filters,
-        [{"$sort": {"created_at": -1}},
-        {"$project": {"city": 1, "start_date": 1, "end_date": 1, "interested_in": 1}},
-        {"$skip": paginated.elements_to_skip},
-        {"$limit": paginated.page_size}]
-    )
-    total_itineraries = mongo.count_documents(Collections.ITINERARIES, filters)
+def to_saved_itineraries(itineraries: list[dict]) -> list[dict]:
+    found_itineraries = []
+    city_metas = find_city_metas([it["city"] for it in itineraries])
 
-    for it in list(cursor):
-        city_meta = find_city_meta(it["city"])
+    for it in itineraries:
+        city_meta = get_city_meta(city_metas, it["city"])
         found_itineraries.append(
             SavedItinerary(
                 id=str(it["_id"]),
@@ -328,6 +478,19 @@ def get_saved_itineraries(user_id: str, paginated: Paginated) -> PaginatedRespon
             ).model_dump()
         )
 
+    return found_itineraries
+
+def get_saved_itineraries(user_id: str, paginated: Paginated) -> PaginatedResponse:
+    logger.info("searching for saved itineraries by user with id %s..", user_id)
+
+    itineraries, total_itineraries = mongo.paginate(
+        Collections.ITINERARIES,
+        {"_id": {"$in": find_saved_itinerary_ids(user_id)}},
+        [{"$project": SAVED_PROJECTION}],
+        paginated
+    )
+    found_itineraries = to_saved_itineraries(itineraries)
+
     logger.info("found %d itineraries saved by user with id %s!", len(found_itineraries), user_id)
 
     return PaginatedResponse(
@@ -337,24 +500,35 @@ def get_saved_itineraries(user_id: str, paginated: Paginated) -> PaginatedRespon
         page_number=paginated.page_number
     )
 
-def get_shared_itineraries(user_id: str, paginated: Paginated) -> PaginatedResponse:
-    found_itineraries = []
-    shared_with_filter = {"shared_with": user_id}
+def get_saved_itineraries_by_cursor(user_id: str, cursor_paginated: CursorPaginated) -> CursorPaginatedResponse:
+    logger.info("searching for saved itineraries by cursor by user with id %s..", user_id)
 
+    itineraries, next_cursor = mongo.aggregate_by_cursor(
+        Collections.ITINERARIES,
+        {"_id": {"$in": find_saved_itinerary_ids(user_id)}},
+        [{"$project": SAVED_PROJECTION}],
+        cursor_paginated
+    )
+    found_itineraries = to_saved_itineraries(itineraries)
+
+    logger.info("found %d itineraries saved by cursor by user with id %s!", len(found_itineraries), user_id)
+
+    return CursorPaginatedResponse(
+        content=found_itineraries,
+        page_size=cursor_paginated.page_size,
+        next_cursor=next_cursor
+    )
+
+def get_shared_itineraries(user_id: str, paginated: Paginated) -> PaginatedResponse:
     logger.info("searching for shared itineraries for user id %s..", user_id)
 
-    cursor = mongo.aggregate(
+    itineraries, total_itineraries = mongo.paginate(
         Collections.ITINERARIES,
-        shared_with_filter,
-        [{"$project": {"details": 0, "docs": 0}},
-        {"$sort": {"created_at": -1}},
-        {"$skip": paginated.elements_to_skip},
-        {"$limit": paginated.page_size}]
+        {"shared_with": user_id},
+        [{"$project": {"details": 0, "docs": 0}}],
+        paginated
     )
-    total_itineraries = mongo.count_documents(Collections.ITINERARIES, shared_with_filter)
-
-    for it in list(cursor):
-        found_itineraries.append(Itinerary(**it).model_dump())
+    found_itineraries = [Itinerary(**it).model_dump() for it in itineraries]
 
     logger.info("found %d shared itineraries for user id %s!", len(found_itineraries), user_id)
 
@@ -365,6 +539,25 @@ def get_shared_itineraries(user_id: str, paginated: Paginated) -> PaginatedRespo
         page_number=paginated.page_number
     )
 
+def get_shared_itineraries_by_cursor(user_id: str, cursor_paginated: CursorPaginated) -> CursorPaginatedResponse:
+    logger.info("searching for shared itineraries by cursor for user id %s..", user_id)
+
+    itineraries, next_cursor = mongo.aggregate_by_cursor(
+        Collections.ITINERARIES,
+        {"shared_with": user_id},
+        [{"$project": {"details": 0, "docs": 0}}],
+        cursor_paginated
+    )
+    found_itineraries = [Itinerary(**it).model_dump() for it in itineraries]
+
+    logger.info("found %d shared itineraries by cursor for user id %s!", len(found_itineraries), user_id)
+
+    return CursorPaginatedResponse(
+        content=found_itineraries,
+        page_size=cursor_paginated.page_size,
+        next_cursor=next_cursor
+    )
+
 def share_with(user_id, share_with_req: ShareWithRequest):
     logger.info("sharing itinerary %s with users %s", share_with_req.id, ','.join(share_with_req.users))
     user_ids = find_users_ids_by_emails(share_with_req.users)
@@ -372,7 +565,7 @@ def share_with(user_id, share_with_req: ShareWithRequest):
     result = mongo.update_one(
         Collections.ITINERARIES,
         {"_id": ObjectId(share_with_req.id), "user_id": user_id},
-        {"$push": {"shared_with": {"$each": user_ids}}},
+        {"$push": {"shared_with": {"$each": user_ids}}, "$set": {"update_at": datetime.now(timezone.utc)}},
     )
 
     if result.matched_count == 0:
@@ -386,7 +579,7 @@ def publish(publish_req: PublishReqeust):
     result = mongo.update_one(
         Collections.ITINERARIES,
         {"_id": ObjectId(publish_req.id)},
-        {"$set": {"is_public": publish_req.is_public}}
+        {"$set": {"is_public": publish_req.is_public, "update_at": datetime.now(timezone.utc)}}
     )
 
     if result.matched_count == 0:
@@ -394,7 +587,7 @@ def publish(publish_req: PublishReqeust):
 
     if result.modified_count == 1:
         if publish_req.is_public:
-            redis_itinerary.get_client().zincrby(MOST_SAVED_ITINERARIES_KEY, 0, str(result.inserted_id))
+            redis_itinerary.get_client().zincrby(MOST_SAVED_ITINERARIES_KEY, 0, publish_req.id)
         else:
             redis_itinerary.get_client().zrem(MOST_SAVED_ITINERARIES_KEY, publish_req.id)
 
@@ -406,7 +599,7 @@ def completed(itinerary_id: str):
     result = mongo.update_one(
         Collections.ITINERARIES,
         {"_id": ObjectId(itinerary_id)},
-        {"$set": {"status": ItineraryStatus.COMPLETED.name}}
+        {"$set": {"status": ItineraryStatus.COMPLETED.name, "update_at": datetime.now(timezone.utc)}}
     )
 
     if result.matched_count == 0:
@@ -433,8 +626,10 @@ def duplicate(user_id: str, duplicate_req: DuplicateRequest) -> str:
 
     result = mongo.insert_one(Collections.ITINERARIES, itinerary.model_dump(exclude={'id'}))
     save_itinerary_meta(result.inserted_id)
+    # the copy gets new dates, its pdf is rendered in background instead of on its first download
+    pdf_render_executor.get_executor().submit(prerender_itinerary_pdf, str(result.inserted_id))
 
-    logger.info("duplicated itinerary %s for user with id!", duplicate_req.id, user_id)
+    logger.info("duplicated itinerary %s for user with id %s!", duplicate_req.id, user_id)
 
     return str(result.inserted_id)
 
@@ -444,7 +639,7 @@ def get_city_description_by_req(request: CityMetaRequest) -> CityDescription:
 def get_city_description(name: str) -> CityDescription:
     conversation = Conversation(CityDescription)
     conversation.add_message_from(CITY_DESCRIPTION_SYSTEM_INSTRUCTIONS)
-    conversation.add_message(ConversationRole.USER.value, CITY_DESCRIPTION_USER_PROMPT.format(city=name))
+    conversation.add_message(ConversationRole.USER.value, CITY_DESCRIPTION_USER_PROMPT.format(city=normalize_city_name(name)))
 
     city_description = assistant.ask(conversation)
 
@@ -470,7 +665,7 @@ def handle_itinerary_request(user_id: str, itinerary_request: ItineraryRequest):
         ConversationRole.USER.value,
         ITINERARY_USER_PROMPT.format(
             month=month,
-            city=itinerary_request.city,
+            city=normalize_city_name(itinerary_request.city),
             travelling_with=travelling_with.value,
             trip_duration=trip_duration,
             min_budget=budget.min,
@@ -491,7 +686,7 @@ def handle_event_itinerary_request(traveler_id: str, itinerary_request: Itinerar
         ConversationRole.USER.value,
         ITINERARY_USER_EVENT_PROMPT.format(
             month=month,
-            city=itinerary_request.city,
+            city=normalize_city_name(itinerary_request.city),
             travelling_with=travelling_with.value,
             trip_duration=trip_duration,
             min_budget=budget.min,
@@ -518,16 +713,42 @@ def generate_itinerary_request(itinerary_request: ItineraryRequest, initial_user
     if itinerary_request.start_date < datetime.combine(date.today(), time.min):
         raise DateNotValidException("start date must be greater or equal to today")
 
+    generation_executor.check_admission()
+
     request_id = mongo.insert_one(Collections.ITINERARY_REQUESTS, itinerary_request.model_dump(exclude={"id"})).inserted_id
-    conversation = Conversation(AssistantItineraryResponse)
+    conversation = Conversation(AssistantItineraryResponse, cacheable=True)
     conversation.add_message_from(ITINERARY_SYSTEM_INSTRUCTIONS)
     conversation.add_message_from(initial_user_prompt)
 
-    threading.Thread(target=generate_day_by_day,args=(conversation, request_id, trip_duration)).start()
-    threading.Thread(target=retrieve_city_meta, args={itinerary_request.city}).start()
+    generation_executor.submit(
+        "generate_itinerary",
+        admission=False,
+        messages=conversation.messages,
+        request_id=request_id,
+        trip_duration=trip_duration,
+        mode=current_app.config["ITINERARY_GENERATION_MODE"]
+    )
+    generation_executor.submit("retrieve_city_meta", admission=False, name=itinerary_request.city)
 
     return request_id
 
+@generation_executor.task("generate_itinerary")
+def generate_itinerary(messages: list[dict], request_id: ObjectId, trip_duration: int, mode: str):
+    conversation = Conversation(AssistantItineraryResponse, cacheable=True)
+    conversation.messages = messages
+
+    # a task claimed again after a worker died starts over from the first day
+    mongo.update_one(
+        Collections.ITINERARY_REQUESTS,
+        {"_id": request_id},
+        {"$set": {"details": [], "status": ItineraryRequestStatus.PENDING.name}}
+    )
+
+    if mode == ItineraryGenerationMode.PARALLEL.name:
+        generate_days_in_parallel(conversation, request_id, trip_duration)
+    else:
+        generate_day_by_day(conversation, request_id, trip_duration)
+
 
 def get_city_image(city: str) -> UnsplashImage:
     logger.info("getting city image for city %s", city)
@@ -536,26 +757,46 @@ def get_city_image(city: str) -> UnsplashImage:
 
     return response
 
+@generation_executor.task("retrieve_city_meta")
 def retrieve_city_meta(name: str):
     logger.info("getting city %s meta..", name)
-    city_meta = find_city_meta(name)
-
-    if not city_meta:
-        logger.info("no city meta found for city %s, getting them..", name)
+    key = encode_city_name(name)
 
-        city_image = get_city_image(encode_city_name(name))
-        city_description = get_city_description(name)
-        city_meta = CityMeta.from_sources(city_image, city_description)
-        mongo.insert_one(Collections.CITY_METAS, city_meta.model_dump(exclude={"id"}))
-    else:
-        logger.info("city meta for city %s already present!", name)
+    redis_itinerary.single_flight(
+        f"city-meta:{key}",
+        lambda: find_city_meta(name),
+        lambda: fetch_city_meta(name)
+    )
 
     logger.info("got city meta for city %s successfully!", name)
 
+def fetch_city_meta(name: str) -> CityMeta:
+    logger.info("no city meta found for city %s, getting them..", name)
+    key = encode_city_name(name)
+
+    city_image = get_city_image(key)
+    city_description = get_city_description(name)
+    city_meta = CityMeta.from_sources(city_image, city_description, key)
+
+    # the first worker to store the key wins, a racing upsert can only be rejected by the unique index
+    try:
+        mongo.update_one(
+            Collections.CITY_METAS,
+            {"key": key},
+            {"$setOnInsert": city_meta.model_dump(exclude={"id"})},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        logger.info("city meta for city %s already stored!", name)
+
+    invalidate_city_meta(key)
+
+    return city_meta
+
 def generate_itinerary_infos(itinerary_request: ItineraryRequest):
     trip_duration = (itinerary_request.end_date - itinerary_request.start_date).days + 1
     month = itinerary_request.start_date.strftime("%B")
-    interested_in = ','.join(Activity[activity].value for activity in itinerary_request.interested_in)
+    interested_in = ','.join(Activity[activity].value for activity in sorted(itinerary_request.interested_in))
     budget = Budget[itinerary_request.budget]
     travelling_with = TravellingWith[itinerary_request.travelling_with]
 
@@ -574,7 +815,7 @@ def generate_day_by_day(conversation: Conversation, request_id: ObjectId, trip_d
 
             logger.info("asking assistant..")
 
-            itinerary_response = assistant.ask(conversation)
+            itinerary_response = assistant.ask(conversation, check_itinerary_day)
 
             mongo.update_one(
                 Collections.ITINERARY_REQUESTS,
@@ -586,16 +827,59 @@ def generate_day_by_day(conversation: Conversation, request_id: ObjectId, trip_d
             logger.info("completed day %d", day)
         except Exception as err:
             logger.error(str(err))
+            logger.info("error on day %d", day)
+            stop_itinerary_generation(request_id)
+            raise
+
+    mongo.update_one(
+        Collections.ITINERARY_REQUESTS,
+        {"_id": request_id},
+        {"$set": {"status": ItineraryRequestStatus.COMPLETED.name}}
+    )
+    logger.info("completed itinerary generation!")
+
+# the task is retried by the executor, the request is failed only once no attempts are left
+def stop_itinerary_generation(request_id: ObjectId):
+    if not generation_executor.is_last_attempt():
+        logger.info("itinerary generation will be retried")
+        return
+
+    mongo.update_one(
+        Collections.ITINERARY_REQUESTS,
+        {"_id": request_id},
+        {"$set": {"status": ItineraryRequestStatus.ERROR.name}}
+    )
+    logger.info("stopped itinerary generation!")
+
+def generate_days_in_parallel(conversation: Conversation, request_id: ObjectId, trip_duration: int):
+    logger.info("starting parallel itinerary generation..")
+    futures = []
+
+    try:
+        skeleton = ask_itinerary_skeleton(conversation, trip_duration)
+        futures = [
+            itinerary_day_executor.get_executor().submit(generate_day, conversation, skeleton, skeleton_day)
+            for skeleton_day in skeleton.skeleton
+        ]
+
+        # days are generated concurrently but pushed in day order
+        for future in futures:
+            day_itinerary = future.result()
 
             mongo.update_one(
                 Collections.ITINERARY_REQUESTS,
                 {"_id": request_id},
-                {"$set": {"status": ItineraryRequestStatus.ERROR.name}}
+                {"$push": {"details": day_itinerary.model_dump()}}
             )
+            logger.info("completed day %d", day_itinerary.day)
+    except Exception as err:
+        logger.error(str(err))
 
-            logger.info("error on day %d", day)
-            logger.info("stopped itinerary generation!")
-            return
+        for future in futures:
+            future.cancel()
+
+        stop_itinerary_generation(request_id)
+        raise
 
     mongo.update_one(
         Collections.ITINERARY_REQUESTS,
@@ -604,25 +888,309 @@ def generate_day_by_day(conversation: Conversation, request_id: ObjectId, trip_d
     )
     logger.info("completed itinerary generation!")
 
-def download_itinerary(itinerary_id) -> BytesIO:
-    itinerary = get_itinerary_by_id(itinerary_id)
-    logger.info("generate pdf for itinerary with id %s", itinerary)
-
-    buffer = BytesIO()
-    doc = PdfItinerary(buffer)
-    doc.draw_header(itinerary)
-    doc.draw_itinerary_information(itinerary)
-    doc.draw_days_itinerary(itinerary)
-    doc.save()
-    buffer.seek(0)
+def ask_itinerary_skeleton(conversation: Conversation, trip_duration: int) -> AssistantItinerarySkeletonResponse:
+    logger.info("asking assistant itinerary skeleton..")
+
+    skeleton_conversation = conversation.copy(AssistantItinerarySkeletonResponse)
+    skeleton_conversation.add_message(
+        ConversationRole.USER.value,
+        ITINERARY_SKELETON_PROMPT.format(trip_duration=trip_duration)
+    )
+
+    def check_skeleton(skeleton: AssistantItinerarySkeletonResponse):
+        covered_days = {skeleton_day.day for skeleton_day in skeleton.skeleton}
+        if any(day not in covered_days for day in range(1, trip_duration + 1)):
+            raise ValueError(f"skeleton does not cover all the {trip_duration} day(s) of the trip")
+
+    skeleton = ask_with_attempts(skeleton_conversation, validate=check_skeleton)
+    skeleton_days = {skeleton_day.day: skeleton_day for skeleton_day in skeleton.skeleton}
+
+    logger.info("got itinerary skeleton!")
+    return AssistantItinerarySkeletonResponse(skeleton=[skeleton_days[day] for day in range(1, trip_duration + 1)])
+
+def generate_day(conversation: Conversation,
+                 skeleton: AssistantItinerarySkeletonResponse,
+                 skeleton_day: AssistantItinerarySkeletonDay) -> AssistantItinerary:
+    logger.info("starting day %d itinerary generation..", skeleton_day.day)
+
+    day_conversation = conversation.copy(AssistantItineraryResponse)
+    day_conversation.add_message(
+        ConversationRole.USER.value,
+        ITINERARY_SKELETON_DAILY_PROMPT.format(
+            day=skeleton_day.day,
+            title=skeleton_day.title,
+            theme=skeleton_day.theme,
+            skeleton=skeleton.model_dump_json()
+        )
+    )
+
+    day_itinerary = ask_with_attempts(day_conversation, validate=check_itinerary_day).itinerary[0]
+    day_itinerary.day = skeleton_day.day
+
+    return day_itinerary
+
+def check_itinerary_day(response: AssistantItineraryResponse):
+    if not response.itinerary:
+        raise ValueError("assistant answered with no itinerary day")
+
+def ask_with_attempts(conversation: Conversation, attempts: int = ITINERARY_GENERATION_DAY_ATTEMPTS, validate=None):
+    for attempt in range(1, attempts + 1):
+        try:
+            response = assistant.ask(conversation, validate)
+            if response is None:
+                raise ValueError("assistant answered with an empty response")
+
+            return response
+        except Exception as err:
+            if attempt == attempts:
+                raise
+
+            logger.warning("assistant attempt %d of %d failed: %s, retrying..", attempt, attempts, str(err))
+
+def get_itinerary_pdf(itinerary_id) -> ItineraryPdf:
+    itinerary_document = mongo.find_one(Collections.ITINERARIES, {'_id': ObjectId(itinerary_id)}, PDF_PROJECTION)
+
+    if itinerary_document is None:
+        raise ElementNotFoundException(f"no itinerary found with id {itinerary_id}")
+
+    return ItineraryPdf(**itinerary_document)
+
+def get_pdf_cache_key(itinerary_id, version: str) -> str:
+    return f"{itinerary_id}-{version}.pdf"
+
+def render_itinerary_pdf(itinerary_id, itinerary: ItineraryPdf, version: str) -> BytesIO:
+    logger.info("generate pdf for itinerary with id %s", itinerary_id)
+    buffer = render_itinerary(itinerary)
+
+    try:
+        pdf_cache.set(get_pdf_cache_key(itinerary_id, version), buffer.getvalue())
+    except OSError as err:
+        logger.warning("cannot cache pdf for itinerary with id %s: %s", itinerary_id, str(err))
+
     return buffer
 
+def download_itinerary(itinerary_id) -> tuple[BinaryIO, str]:
+    itinerary = get_itinerary_pdf(itinerary_id)
+    version = itinerary.get_version(LAYOUT_VERSION)
+    pdf_file = pdf_cache.get(get_pdf_cache_key(itinerary_id, version))
+
+    if pdf_file:
+        logger.info("serving cached pdf for itinerary with id %s", itinerary_id)
+        return pdf_file, version
+
+    return render_itinerary_pdf(itinerary_id, itinerary, version), version
+
+def prerender_itinerary_pdf(itinerary_id):
+    try:
+        # reloaded as stored, dates are rounded by mongo and the version must match the one of the download
+        itinerary = get_itinerary_pdf(itinerary_id)
+        render_itinerary_pdf(itinerary_id, itinerary, itinerary.get_version(LAYOUT_VERSION))
+    except Exception as err:
+        logger.error("cannot pre-render pdf for itinerary with id %s: %s", itinerary_id, str(err))
+
+def invalidate_itinerary_pdf(itinerary_id):
+    try:
+        pdf_cache.invalidate_prefix(f"{itinerary_id}-")
+    except OSError as err:
+        logger.warning("cannot invalidate cached pdf for itinerary with id %s: %s", itinerary_id, str(err))
+
+def request_itinerary_export(user_id: str, export_request: ItineraryExportRequest) -> str:
+    logger.info("requesting export of itineraries matching %s..", export_request.model_dump_json(exclude_none=True))
+    generation_executor.check_admission()
+
+    now = datetime.now(timezone.utc)
+    result = mongo.insert_one(Collections.ITINERARY_EXPORTS, {
+        "requested_by": user_id,
+        "filters": export_request.model_dump(),
+        "status": ItineraryExportStatus.PENDING.name,
+        "total": 0,
+        "processed": 0,
+        "failed": 0,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "completed_at": None
+    })
+    generation_executor.submit("export_itineraries", admission=False, export_id=str(result.inserted_id))
+
+    logger.info("requested export with id %s!", result.inserted_id)
+    return str(result.inserted_id)
+
+def get_itinerary_export(export_id: str) -> ItineraryExport:
+    export_document = mongo.find_one(Collections.ITINERARY_EXPORTS, {"_id": ObjectId(export_id)})
+
+    if export_document is None:
+        raise ElementNotFoundException(f"no export found with id {export_id}")
+
+    return ItineraryExport(**export_document)
+
+def get_export_path(export_id: str) -> str:
+    return os.path.join(current_app.config["EXPORT_DIR"], f"{export_id}.zip")
+
+def get_itinerary_export_file(export_id: str) -> str:
+    export = get_itinerary_export(export_id)
+
+    if export.status != ItineraryExportStatus.COMPLETED.name:
+        raise ExportNotReadyException(f"export {export_id} is not completed, its status is {export.status}")
+
+    path = get_export_path(export_id)
+    if not os.path.exists(path):
+        raise ElementNotFoundException(f"no archive found for export with id {export_id}")
+
+    return path
+
+def delete_expired_exports():
+    export_dir = current_app.config["EXPORT_DIR"]
+    expired_before = datetime.now().timestamp() - current_app.config["EXPORT_RETENTION_SECONDS"]
+    deleted = 0
+
+    if not os.path.isdir(export_dir):
+        return
+
+    # archives and parts left by a dead worker, their export documents expire through the ttl index
+    for entry in os.scandir(export_dir):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < expired_before:
+                os.remove(entry.path)
+                deleted += 1
+        except OSError as err:
+            logger.warning("cannot delete expired export %s: %s", entry.path, str(err))
+
+    if deleted > 0:
+        logger.info("deleted %d expired exports from %s", deleted, export_dir)
+
+def update_itinerary_export(export_id: str, fields: dict):
+    mongo.update_one(
+        Collections.ITINERARY_EXPORTS,
+        {"_id": ObjectId(export_id)},
+        {"$set": {**fields, "updated_at": datetime.now(timezone.utc)}}
+    )
+
+def build_export_filters(export_request: ItineraryExportRequest) -> dict:
+    filters = {}
+
+    if export_request.user_id:
+        filters["user_id"] = export_request.user_id
+    if export_request.city:
+        filters["city"] = export_request.city
+    if export_request.start_date:
+        filters["start_date"] = {"$gte": export_request.start_date}
+    if export_request.end_date:
+        filters["end_date"] = {"$lte": export_request.end_date}
+
+    return filters
+
+def iter_itineraries_to_export(filters: dict, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    last_id = None
+
+    # one batch at a time by _id, no cursor is kept open while the pdfs are rendered
+    while True:
+        batch_filters = dict(filters)
+        if last_id:
+            batch_filters["_id"] = {"$gt": last_id}
+
+        batch = list(mongo.find(Collections.ITINERARIES, batch_filters, PDF_PROJECTION).sort("_id", 1).limit(batch_size))
+        if not batch:
+            return
+
+        last_id = batch[-1]["_id"]
+        yield from batch
+
+def submit_export_render(pool: ProcessPoolExecutor, itinerary: ItineraryPdf, itinerary_id: str) -> Future:
+    cached_pdf = pdf_cache.get(get_pdf_cache_key(itinerary_id, itinerary.get_version(LAYOUT_VERSION)))
+
+    if not cached_pdf:
+        return pool.submit(render_itinerary_bytes, itinerary)
+
+    future = Future()
+    with cached_pdf:
+        future.set_result(cached_pdf.read())
+    return future
+
+def render_for_export(pool: ProcessPoolExecutor, documents: Iterable[dict], window: int) -> Iterator[tuple[dict, Future]]:
+    in_flight = deque()
+
+    # at most window pdfs are rendered or waiting to be written, results are yielded in query order
+    for document in documents:
+        in_flight.append((document, submit_export_render(pool, ItineraryPdf(**document), str(document["_id"]))))
+
+        if len(in_flight) >= window:
+            yield in_flight.popleft()
+
+    while in_flight:
+        yield in_flight.popleft()
+
+def get_export_entry_name(document: dict) -> str:
+    return f"{encode_city_name(document['city'])}-{document['start_date'].strftime('%Y%m%d')}-{document['_id']}.pdf"
+
+@generation_executor.task("export_itineraries")
+def export_itineraries(export_id: str):
+    export = get_itinerary_export(export_id)
+    filters = build_export_filters(export.filters)
+    total = mongo.count_documents(Collections.ITINERARIES, dict(filters))
+    logger.info("exporting %d itineraries for export with id %s..", total, export_id)
+    update_itinerary_export(export_id, {
+        "status": ItineraryExportStatus.RUNNING.name,
+        "total": total,
+        "processed": 0,
+        "failed": 0,
+        "error": None,
+        "completed_at": None
+    })
+
+    delete_expired_exports()
+    path = get_export_path(export_id)
+    temp_path = f"{path}.part"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    workers = current_app.config["EXPORT_PROCESS_WORKERS"]
+    processed = 0
+    failed = 0
+
+    try:
+        # reportlab holds the gil, pdfs are rendered on processes spawned clean instead of forked from a threaded worker
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool, \
+                zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for document, pdf in render_for_export(pool, iter_itineraries_to_export(filters), workers * 2):
+                try:
+                    archive.writestr(get_export_entry_name(document), pdf.result())
+                except Exception as err:
+                    failed += 1
+                    logger.error("cannot export itinerary with id %s: %s", document["_id"], str(err))
+
+                processed += 1
+                if processed % EXPORT_PROGRESS_INTERVAL == 0:
+                    update_itinerary_export(export_id, {"processed": processed, "failed": failed})
+                    generation_executor.extend_lease()
+
+        os.replace(temp_path, path)
+    except Exception as err:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+        update_itinerary_export(export_id, {
+            "status": ItineraryExportStatus.ERROR.name,
+            "processed": processed,
+            "failed": failed,
+            "error": str(err),
+            "completed_at": datetime.now(timezone.utc)
+        })
+        raise
+
+    update_itinerary_export(export_id, {
+        "status": ItineraryExportStatus.COMPLETED.name,
+        "processed": processed,
+        "failed": failed,
+        "completed_at": datetime.now(timezone.utc)
+    })
+    logger.info("exported %d itineraries for export with id %s, %d failed!", processed, export_id, failed)
+
+
 def update_itinerary_status(itinerary_id: str,
                             status: ItineraryStatus):
     mongo.update_one(
         Collections.ITINERARIES,
         {'_id': ObjectId(itinerary_id)},
-        {"status": status.name}
+        {"$set": {"status": status.name, "update_at": datetime.now(timezone.utc)}}
     )
     logger.info("updated status of itinerary with id %s", itinerary_id)
 
@@ -670,19 +1238,39 @@ def handle_save_itinerary(user_id: str, itinerary_id: str):
         logger.info("itinerary %s removed from saved for user %s!", itinerary_id, user_id)
 
 
-def get_most_saved():
-    most_saved = redis_itinerary.get_client().zrevrange(name=MOST_SAVED_ITINERARIES_KEY, start=0, end=4, withscores=True)
+def get_most_saved_ranking() -> list[tuple[str, float]]:
+    return redis_itinerary.get_client().zrevrange(name=MOST_SAVED_ITINERARIES_KEY, start=0, end=4, withscores=True)
+
+def get_most_saved_etag(most_saved: list[tuple[str, float]]) -> str:
+    itinerary_ids = [ObjectId(itinerary_id) for itinerary_id, _ in most_saved]
+    versions = mongo.find(
+        Collections.ITINERARIES,
+        {"_id": {"$in": itinerary_ids}, "is_public": True},
+        VERSION_PROJECTION
+    ).sort("_id", 1)
+
+    return build_etag(
+        *(f"{itinerary_id}={score}" for itinerary_id, score in most_saved),
+        *(f"{version['_id']}@{version.get('update_at') or version.get('created_at')}" for version in versions)
+    )
+
+def get_most_saved(most_saved: list[tuple[str, float]] = None):
+    if most_saved is None:
+        most_saved = get_most_saved_ranking()
+
     itinerary_ids = list(map(lambda x: ObjectId(x[0]), most_saved))
     itineraries = mongo.find(
         Collections.ITINERARIES,
         {"_id": {"$in": itinerary_ids},"is_public": True},
         {"city": 1, "start_date": 1, "end_date": 1, "interested_in": 1, "travelling_with": 1, "budget": 1},
     )
+    itineraries = list(itineraries)
+    city_metas = find_city_metas([itinerary.get("city") for itinerary in itineraries])
     spotlight_itineraries = []
 
     for itinerary in itineraries:
         saved_by = filter(lambda x: x[0] == str(itinerary.get("_id")), most_saved)
-        city_meta = find_city_meta(itinerary.get("city"))
+        city_meta = get_city_meta(city_metas, itinerary.get("city"))
         spotlight_itineraries.append(
             SpotlightItinerary(
                 id=str(itinerary.get("_id")),
@@ -747,9 +1335,11 @@ def get_upcoming_itineraries(user_id: str):
         ]
     )
     found_itineraries = []
+    itineraries = list(cursor)
+    city_metas = find_city_metas([it.get("city") for it in itineraries])
 
-    for it in list(cursor):
-        city_meta = find_city_meta(it.get("city"))
+    for it in itineraries:
+        city_meta = get_city_meta(city_metas, it.get("city"))
         found_itineraries.append(
             UpcomingItinerary(
                 id=str(it.get("_id")),
@@ -793,9 +1383,11 @@ def get_past_itineraries(user_id: str):
         ]
     )
     found_itineraries = []
+    itineraries = list(cursor)
+    city_metas = find_city_metas([it.get("city") for it in itineraries])
 
-    for it in list(cursor):
-        city_meta = find_city_meta(it.get("city"))
+    for it in itineraries:
+        city_meta = get_city_meta(city_metas, it.get("city"))
         found_itineraries.append(
             PastItinerary(
                 id=str(it.get("_id")),
@@ -820,7 +1412,7 @@ def remove_shared_with(user_id: str, request: ShareWithRequest):
     result = mongo.update_one(
         Collections.ITINERARIES,
         {"_id": ObjectId(request.id), "user_id": user_id},
-        {"$pull": {"shared_with": {"$in": request.users}}}
+        {"$pull": {"shared_with": {"$in": request.users}}, "$set": {"update_at": datetime.now(timezone.utc)}}
     )
 
     if result.matched_count == 0:
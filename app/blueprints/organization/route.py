@@ -7,9 +7,10 @@ from pydantic import ValidationError
 from app.blueprints.organization import organization
 from app.blueprints.organization.model import CreateOrganizationRequest, UpdateOrganizationRequest
 from app.blueprints.organization.service import create_organization, get_organization_by_id, update_organization, \
-    get_pending_organizations, handle_active_organization, get_full_organization_by_id
+    get_pending_organizations, handle_active_organization, get_full_organization_by_id, \
+    get_pending_organizations_by_cursor
 from app.exceptions import ElementAlreadyExistsException, ElementNotFoundException
-from app.models import Paginated
+from app.models import Paginated, CursorPaginated
 from app.response_wrapper import bad_request_response, success_response, conflict_response, not_found_response, \
     error_response, no_content_response
 from app.role import roles_required, Role
@@ -21,7 +22,7 @@ logger = logging.getLogger(__name__)
 def get():
     try:
         organization = get_full_organization_by_id(get_jwt_identity())
-        return success_response(organization.model_dump())
+        return success_response(organization)
     except ElementNotFoundException as err:
         logger.warning(str(err))
         return not_found_response(err.message)
@@ -72,7 +73,7 @@ def pending_organizations():
     try:
         organizations = get_pending_organizations(Paginated(**request.json))
 
-        return success_response(organizations.model_dump())
+        return success_response(organizations)
     except ValidationError as err:
         logger.error("validation error while parsing paginated pending organizations request", err)
         return bad_request_response(err.errors())
@@ -80,6 +81,20 @@ def pending_organizations():
         logger.error(str(err))
         return error_response()
 
+@organization.post('/pending/cursor')
+@roles_required([Role.ADMIN.name])
+def pending_organizations_by_cursor():
+    try:
+        organizations = get_pending_organizations_by_cursor(CursorPaginated(**request.json))
+
+        return success_response(organizations)
+    except ValidationError as err:
+        logger.error("validation error while parsing cursor paginated pending organizations request: %s", err)
+        return bad_request_response(err.errors())
+    except Exception as err:
+        logger.error(str(err))
+        return error_response()
+
 @organization.patch('/active/<organization_id>')
 @roles_required([Role.ADMIN.name])
 def active_organization(organization_id):
@@ -9,7 +9,7 @@ from app.blueprints.organization.model import CreateOrganizationRequest, Organiz
 from app.blueprints.user.service import create_user, get_user_by_id, update_user_email
 from app.exceptions import ElementNotFoundException
 from app.extensions import mongo
-from app.models import Paginated, PaginatedResponse, Collections
+from app.models import Paginated, PaginatedResponse, Collections, CursorPaginated, CursorPaginatedResponse
 from app.role import Role
 
 logger = logging.getLogger(__name__)
@@ -81,22 +81,15 @@ def update_organization(user_id: str, updated_organization: UpdateOrganizationRe
     logger.info("organization with id %s updated successfully", user_id)
 
 def get_pending_organizations(paginated: Paginated) -> PaginatedResponse:
-    found_organizations = []
-    filters = {"status": OrganizationStatus.PENDING.name}
-
     logger.info("searching for pending organizations..")
 
-    cursor = mongo.aggregate(
+    organizations, total_organizations_pending = mongo.paginate(
         Collections.ORGANIZATIONS,
-        filters,
-        [{"$sort": {"created_at": -1}},
-        {"$skip": paginated.elements_to_skip},
-        {"$limit": paginated.page_size}]
+        {"status": OrganizationStatus.PENDING.name},
+        [],
+        paginated
     )
-    total_organizations_pending = mongo.count_documents(Collections.ORGANIZATIONS, filters)
-
-    for org in list(cursor):
-        found_organizations.append(Organization(**org).model_dump())
+    found_organizations = [Organization(**org).model_dump() for org in organizations]
 
     logger.info("found %d pending organizations!", len(found_organizations))
 
@@ -107,6 +100,25 @@ def get_pending_organizations(paginated: Paginated) -> PaginatedResponse:
         page_number=paginated.page_number
     )
 
+def get_pending_organizations_by_cursor(cursor_paginated: CursorPaginated) -> CursorPaginatedResponse:
+    logger.info("searching for pending organizations by cursor..")
+
+    organizations, next_cursor = mongo.aggregate_by_cursor(
+        Collections.ORGANIZATIONS,
+        {"status": OrganizationStatus.PENDING.name},
+        [],
+        cursor_paginated
+    )
+    found_organizations = [Organization(**org).model_dump() for org in organizations]
+
+    logger.info("found %d pending organizations by cursor!", len(found_organizations))
+
+    return CursorPaginatedResponse(
+        content=found_organizations,
+        page_size=cursor_paginated.page_size,
+        next_cursor=next_cursor
+    )
+
 def handle_active_organization(organization_id: str):
     logger.info("activating organization with id %s", organization_id)
     result = mongo.update_one(
@@ -1,5 +1,7 @@
 from flask_mailman import EmailMessage
 
+from app.extensions import mail_outbox
+
 
 def send_traveler_signup_mail(url: str, email: str):
     message = EmailMessage(
@@ -7,4 +9,4 @@ def send_traveler_signup_mail(url: str, email: str):
         body=f"Your registration has been confirmed! Go to {url} to complete your profile!",
         to=[email]
     )
-    message.send()
\ No newline at end of file
+    mail_outbox.enqueue(message)
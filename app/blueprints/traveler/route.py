@@ -21,7 +21,7 @@ logger = logging.getLogger(__name__)
 def get_traveler(traveler_id):
     try:
         traveler = get_traveler_by_id(traveler_id)
-        return success_response(traveler.model_dump())
+        return success_response(traveler)
     except ElementNotFoundException as err:
         logger.warning(str(err))
         return not_found_response(err.message)
@@ -34,7 +34,7 @@ def get_traveler(traveler_id):
 def get_full_traveler():
     try:
         traveler = get_full_traveler_by_id(get_jwt_identity())
-        return success_response(traveler.model_dump())
+        return success_response(traveler)
     except ElementNotFoundException as err:
         logger.warning(str(err))
         return not_found_response(err.message)
@@ -47,7 +47,7 @@ def get_full_traveler():
 def get_logged_traveler():
     try:
         traveler = get_traveler_by_user_id(get_jwt_identity())
-        return success_response(traveler.model_dump())
+        return success_response(traveler)
     except ElementNotFoundException as err:
         logger.warning(str(err))
         return not_found_response(err.message)
@@ -1,6 +1,7 @@
 import logging
 import secrets
 from datetime import datetime, timezone
+from typing import Iterator
 
 from bson import ObjectId
 from flask import url_for
@@ -52,6 +53,10 @@ def get_traveler_by_user_id(user_id: str) -> Traveler:
     logger.info("found traveler with user id %s", user_id)
     return Traveler(**traveler_document)
 
+def find_travelers_by_user_ids(user_ids: list[str]) -> dict[str, Traveler]:
+    cursor = mongo.find(Collections.TRAVELERS, {"user_id": {"$in": user_ids}})
+    return {traveler["user_id"]: Traveler(**traveler) for traveler in cursor}
+
 def save_traveler_signup(traveler_id: str, email: str):
     logger.info("saving traveler signup for traveler with id %s", traveler_id)
     token = secrets.token_urlsafe(16)
@@ -125,15 +130,18 @@ def get_signup_request(token: str):
 
     return traveler_signup
 
-def get_all_travelers():
-    found_travelers = []
-    cursor = mongo.find(Collections.TRAVELERS,{})
-    travelers = list(cursor)
-    if len(travelers) == 0:
-        raise ElementNotFoundException("travelers not found")
+def iter_travelers_to_newsletter(batch_size: int) -> Iterator[list[Traveler]]:
+    last_id = None
+
+    # one batch at a time by _id, no cursor is kept open while the batch is processed
+    while True:
+        filters = {"interested_in.0": {"$exists": True}}
+        if last_id:
+            filters["_id"] = {"$gt": last_id}
 
-    for traveler in travelers:
-        found_travelers.append(Traveler(**traveler))
+        batch = list(mongo.find(Collections.TRAVELERS, filters).sort("_id", 1).limit(batch_size))
+        if not batch:
+            return
 
-    logger.info("found %d travelers", len(found_travelers))
-    return found_travelers
\ No newline at end of file
+        last_id = batch[-1]["_id"]
+        yield [Traveler(**traveler) for traveler in batch]
@@ -2,6 +2,8 @@ import logging
 
 from flask_mailman import EmailMessage
 
+from app.extensions import mail_outbox
+
 logger = logging.getLogger(__name__)
 
 def send_forgot_password_mail(email: str, reset_url: str):
@@ -10,4 +12,4 @@ def send_forgot_password_mail(email: str, reset_url: str):
         body=f"Reset your password here {reset_url}!",
         to=[email]
     )
-    message.send()
\ No newline at end of file
+    mail_outbox.enqueue(message)
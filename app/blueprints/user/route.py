@@ -23,7 +23,7 @@ def login():
         login_req = LoginRequest(**request.json)
         token = handle_login(login_req)
 
-        return success_response(token.model_dump())
+        return success_response(token)
     except ValidationError as err:
         logger.error("validation error while parsing login request")
         return bad_request_response(err.errors())
@@ -58,7 +58,7 @@ def logout():
 def refresh_token():
     try:
         token = handle_refresh_token(get_jwt())
-        return success_response(token.model_dump())
+        return success_response(token)
     except ValidationError as err:
         logger.error("validation error while parsing login request")
         return bad_request_response(err.errors())
@@ -89,7 +89,7 @@ def reset_password():
         reset_password_req = ResetPasswordRequest(**request.json)
         token = handle_reset_password(reset_password_req)
 
-        return success_response(token.model_dump())
+        return success_response(token)
     except ValidationError as err:
         logger.error("validation error while parsing reset password request", err)
         return bad_request_response(err.errors())
@@ -14,7 +14,8 @@ from app.blueprints.user.model import User, Token, ForgotPasswordRequest, ResetP
     WrongPasswordException, LogoutRequest, RefreshTokenRevoked, SearchUserRequest, \
     SearchUserResponse, UserEmailResponse
 from app.exceptions import ElementAlreadyExistsException, ElementNotFoundException
-from app.extensions import mongo, redis_auth
+from app.extensions import mongo, redis_auth, password_update_cache, PASSWORD_UPDATE_INVALIDATION_CHANNEL, \
+    LAST_PASSWORD_UPDATE_KEY, jti_blocklist, JTI_BLOCKLIST_CHANNEL
 from app.models import Collections
 from app.role import Role
 
@@ -78,6 +79,8 @@ def blacklist_token(jwt: dict):
     expire = expire_timestamp - current_timestamp
 
     redis_auth.get_client().set(jti, "", expire)
+    jti_blocklist.add(jti, jwt["exp"])
+    redis_auth.publish(JTI_BLOCKLIST_CHANNEL, jti_blocklist.build_message(jti, jwt["exp"]))
 
 def blacklist_refresh_token(token: str):
     jwt = decode_token(token)
@@ -137,6 +140,7 @@ def handle_reset_password(reset_password_req: ResetPasswordRequest) -> Token:
         raise ElementNotFoundException(f"no reset token found with value {reset_password_req.token}")
 
     user_id = reset_token.get("user_id")
+    last_password_update = datetime.now(timezone.utc) - timedelta(seconds=1)
 
     logger.info("resetting user %s password..", user_id)
 
@@ -146,10 +150,11 @@ def handle_reset_password(reset_password_req: ResetPasswordRequest) -> Token:
         {"$set":
             {
                 "password": generate_password_hash(reset_password_req.password),
-                "last_password_update": datetime.now(timezone.utc) - timedelta(seconds=1)
+                "last_password_update": last_password_update
             }
         }
     )
+    refresh_last_password_update(user_id, last_password_update)
 
     mongo.delete_one(Collections.USERS, {"_id": reset_token.get("_id")})
 
@@ -158,11 +163,66 @@ def handle_reset_password(reset_password_req: ResetPasswordRequest) -> Token:
     return generate_tokens(get_user_by_id(user_id))
 
 def is_token_not_valid(user_id: str, iat: int, jti) -> bool:
-    projected_user = mongo.find_one(Collections.USERS, {"_id": ObjectId(user_id)}, {"last_password_update": 1, "_id": 0})
-    last_password_update = projected_user.get("last_password_update").replace(tzinfo=timezone.utc)
     issued_at = datetime.fromtimestamp(iat, timezone.utc)
+    generation = password_update_cache.get_generation()
+    last_password_update = password_update_cache.get(user_id)
+
+    if last_password_update is not None:
+        return issued_at < last_password_update or is_blacklisted(jti)
+
+    # last password update and blacklist are read in the same round trip
+    pipeline = redis_auth.get_client().pipeline(transaction=False)
+    pipeline.get(LAST_PASSWORD_UPDATE_KEY.format(user_id=user_id))
+    pipeline.exists(jti)
+    stored_timestamp, blacklisted = pipeline.execute()
+
+    if stored_timestamp is not None:
+        last_password_update = datetime.fromtimestamp(float(stored_timestamp), timezone.utc)
+    else:
+        last_password_update = find_last_password_update(user_id)
+        if last_password_update is None:
+            return True
+
+        # nx: a concurrent password reset is never overwritten with the stale value
+        redis_auth.get_client().set(
+            LAST_PASSWORD_UPDATE_KEY.format(user_id=user_id),
+            last_password_update.timestamp(),
+            ex=current_app.config["PASSWORD_UPDATE_REDIS_TTL_SECONDS"],
+            nx=True
+        )
+
+    # a password reset published while redis or mongo were read must not be overwritten by the value read
+    password_update_cache.set(user_id, last_password_update, generation)
+
+    return issued_at < last_password_update or blacklisted > 0
+
+def is_blacklisted(jti: str) -> bool:
+    # a filter miss means the jti was never blacklisted, only possible hits are checked on redis
+    if not jti_blocklist.might_contain(jti):
+        return False
+
+    blacklisted = redis_auth.get_client().exists(jti) > 0
+    if not blacklisted:
+        jti_blocklist.record_false_positive()
+
+    return blacklisted
+
+def find_last_password_update(user_id: str) -> Optional[datetime]:
+    projected_user = mongo.find_one(Collections.USERS, {"_id": ObjectId(user_id)}, {"last_password_update": 1, "_id": 0})
+    if not projected_user:
+        logger.warning("no user found with id %s while validating token", user_id)
+        return None
 
-    return issued_at < last_password_update or redis_auth.get_client().exists(jti)
+    return projected_user.get("last_password_update").replace(tzinfo=timezone.utc)
+
+def refresh_last_password_update(user_id: str, last_password_update: datetime):
+    redis_auth.get_client().set(
+        LAST_PASSWORD_UPDATE_KEY.format(user_id=user_id),
+        last_password_update.timestamp(),
+        ex=current_app.config["PASSWORD_UPDATE_REDIS_TTL_SECONDS"]
+    )
+    password_update_cache.invalidate(user_id)
+    redis_auth.publish(PASSWORD_UPDATE_INVALIDATION_CHANNEL, user_id)
 
 def update_user_email(user_id: str, email: str):
     logger.info("updating user %s email to %s", user_id, email)
@@ -194,6 +254,10 @@ def find_users_emails_by_ids(ids: list[str]):
 
     return found_users
 
+def find_emails_by_user_ids(user_ids: list[str]) -> dict[str, str]:
+    users = mongo.find(Collections.USERS, {'_id': {"$in": [ObjectId(user_id) for user_id in user_ids]}}, {"email": 1})
+    return {str(user.get("_id")): user.get("email") for user in users}
+
 def find_users_ids_by_emails(emails: list[str]):
     users = mongo.find(Collections.USERS, {'email': {"$in": emails}}, {"_id": 1})
     found_users = []
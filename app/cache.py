@@ -0,0 +1,200 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, BinaryIO
+
+from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+class LocalCache:
+    def __init__(self, max_size_config: str, ttl_config: str):
+        self.max_size_config = max_size_config
+        self.ttl_config = ttl_config
+        self.max_size = 0
+        self.ttl = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app: Flask):
+        self.max_size = app.config[self.max_size_config]
+        self.ttl = app.config[self.ttl_config]
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None or entry[1] < time.monotonic():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_many(self, keys) -> dict:
+        found = {}
+
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+
+        return found
+
+    # read before loading a value: a set with an older generation raced an invalidation and is dropped
+    def get_generation(self) -> int:
+        with self.lock:
+            return self.generation
+
+    def set(self, key, value, generation: int = None):
+        if self.max_size <= 0:
+            return
+
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+
+            # least recently used entries are at the beginning
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.generation += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / (self.hits + self.misses) if self.hits + self.misses > 0 else 0
+            }
+
+# files are shared by every worker process through the directory: writes go to a temp file renamed in place
+# and hits refresh the mtime, so eviction drops the least recently used files once the size limit is exceeded
+class DiskCache:
+    TEMP_SUFFIX = ".tmp"
+
+    def __init__(self, dir_config: str, max_bytes_config: str):
+        self.dir_config = dir_config
+        self.max_bytes_config = max_bytes_config
+        self.dir = None
+        self.max_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app: Flask):
+        self.dir = app.config[self.dir_config]
+        self.max_bytes = app.config[self.max_bytes_config]
+        os.makedirs(self.dir, exist_ok=True)
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.dir, key)
+
+    def get(self, key: str) -> Optional[BinaryIO]:
+        # the file is opened here, a concurrent eviction cannot remove it while it is being served
+        try:
+            file = open(self.get_path(key), "rb")
+            os.utime(file.fileno())
+        except FileNotFoundError:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return file
+
+    def set(self, key: str, content: bytes):
+        if self.max_bytes <= 0:
+            return
+
+        fd, temp_path = tempfile.mkstemp(dir=self.dir, suffix=self.TEMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(content)
+            os.replace(temp_path, self.get_path(key))
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        self.evict()
+
+    def invalidate_prefix(self, prefix: str):
+        for name in os.listdir(self.dir):
+            if name.startswith(prefix) and not name.endswith(self.TEMP_SUFFIX):
+                self.remove(name)
+
+    def remove(self, name: str) -> bool:
+        try:
+            os.remove(self.get_path(name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list_files(self) -> list[tuple[str, os.stat_result]]:
+        files = []
+
+        for entry in os.scandir(self.dir):
+            if not entry.is_file() or entry.name.endswith(self.TEMP_SUFFIX):
+                continue
+
+            try:
+                files.append((entry.name, entry.stat()))
+            except FileNotFoundError:
+                continue
+
+        return files
+
+    def evict(self):
+        with self.lock:
+            files = self.list_files()
+            total = sum(stat.st_size for _, stat in files)
+
+            if total <= self.max_bytes:
+                return
+
+            for name, stat in sorted(files, key=lambda file: file[1].st_mtime):
+                if total <= self.max_bytes:
+                    break
+
+                if self.remove(name):
+                    self.evictions += 1
+                total -= stat.st_size
+
+        logger.info("disk cache %s evicted down to %d bytes", self.dir, total)
+
+    def stats(self) -> dict:
+        files = self.list_files()
+
+        with self.lock:
+            return {
+                "files": len(files),
+                "bytes": sum(stat.st_size for _, stat in files),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / (self.hits + self.misses) if self.hits + self.misses > 0 else 0
+            }
@@ -0,0 +1,190 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+from typing import Optional
+
+from flask import Flask, Response, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+# responses are compressed on the fly above a size threshold, static assets are compressed once
+# and served with long lived cache headers when requested through their fingerprinted url
+class Compressor:
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.min_size = None
+        self.gzip_level = None
+        self.brotli_quality = None
+        self.mimetypes = set()
+        self.static_dir = None
+        self.static_max_age = None
+        self.fingerprints = {}
+
+    def init_app(self, app: Flask):
+        self.app = app
+        self.enabled = app.config["COMPRESSION_ENABLED"]
+        self.min_size = app.config["COMPRESSION_MIN_SIZE"]
+        self.gzip_level = app.config["COMPRESSION_GZIP_LEVEL"]
+        self.brotli_quality = app.config["COMPRESSION_BROTLI_QUALITY"]
+        self.mimetypes = set(app.config["COMPRESSION_MIMETYPES"])
+        self.static_dir = app.config["STATIC_COMPRESSED_DIR"]
+        self.static_max_age = app.config["STATIC_MAX_AGE_SECONDS"]
+
+        app.after_request(self.compress_response)
+
+        if app.has_static_folder:
+            app.url_defaults(self.add_fingerprint)
+            app.view_functions["static"] = self.send_static_file
+
+    @staticmethod
+    def get_encodings() -> list[str]:
+        return ["br", "gzip"] if brotli else ["gzip"]
+
+    def get_accepted_encoding(self) -> Optional[str]:
+        for encoding in self.get_encodings():
+            if request.accept_encodings[encoding]:
+                return encoding
+
+        return None
+
+    def compress(self, data: bytes, encoding: str, static: bool = False) -> bytes:
+        if encoding == "br":
+            return brotli.compress(data, quality=STATIC_BROTLI_QUALITY if static else self.brotli_quality)
+
+        return gzip.compress(data, compresslevel=STATIC_GZIP_LEVEL if static else self.gzip_level)
+
+    def compress_response(self, response: Response) -> Response:
+        # files and streams are served as they are, static assets are precompressed
+        if not self.enabled or response.direct_passthrough or response.is_streamed:
+            return response
+
+        if (
+            response.status_code < 200 or
+            response.status_code in (204, 206, 304) or
+            "Content-Encoding" in response.headers or
+            response.mimetype not in self.mimetypes
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = self.get_accepted_encoding()
+        if not encoding:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.set_data(self.compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+
+        # the compressed body is no longer byte for byte the one the etag was computed on
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        return response
+
+    def get_compressed_path(self, filename: str, encoding: str) -> Optional[str]:
+        return safe_join(self.static_dir, filename + EXTENSIONS[encoding])
+
+    # a copy older than its source was compressed before the asset changed and is not served
+    def is_compressed_fresh(self, filename: str, compressed_path: str) -> bool:
+        source = safe_join(self.app.static_folder, filename)
+        if not source or not os.path.isfile(compressed_path):
+            return False
+
+        try:
+            return os.path.getmtime(compressed_path) >= os.path.getmtime(source)
+        except OSError:
+            return False
+
+    def get_fingerprint(self, filename: str) -> Optional[str]:
+        fingerprint = self.fingerprints.get(filename)
+        if fingerprint:
+            return fingerprint
+
+        path = safe_join(self.app.static_folder, filename)
+        if not path or not os.path.isfile(path):
+            return None
+
+        with open(path, "rb") as file:
+            fingerprint = hashlib.sha256(file.read()).hexdigest()[:12]
+
+        # assets change while developing, they are hashed again on every url
+        if not self.app.debug:
+            self.fingerprints[filename] = fingerprint
+
+        return fingerprint
+
+    def add_fingerprint(self, endpoint: str, values: dict):
+        if endpoint != "static" or "filename" not in values or "v" in values:
+            return
+
+        fingerprint = self.get_fingerprint(values["filename"])
+        if fingerprint:
+            values["v"] = fingerprint
+
+    def send_static_file(self, filename: str) -> Response:
+        # a fingerprinted url changes with the content of the file, it can be cached forever
+        max_age = self.static_max_age if request.args.get("v") else None
+        mimetype = mimetypes.guess_type(filename)[0]
+        encoding = self.get_accepted_encoding() if self.enabled and mimetype in self.mimetypes else None
+        compressed_path = self.get_compressed_path(filename, encoding) if encoding else None
+
+        if compressed_path and self.is_compressed_fresh(filename, compressed_path):
+            response = send_from_directory(self.static_dir, filename + EXTENSIONS[encoding], mimetype=mimetype, max_age=max_age)
+            response.headers["Content-Encoding"] = encoding
+        else:
+            response = send_from_directory(self.app.static_folder, filename, max_age=max_age)
+
+        if mimetype in self.mimetypes:
+            response.vary.add("Accept-Encoding")
+        if max_age:
+            response.cache_control.immutable = True
+
+        return response
+
+    def compress_static_assets(self) -> int:
+        compressed = 0
+
+        for root, _, files in os.walk(self.app.static_folder):
+            for name in files:
+                source = os.path.join(root, name)
+                filename = os.path.relpath(source, self.app.static_folder)
+
+                if mimetypes.guess_type(name)[0] not in self.mimetypes or os.path.getsize(source) < self.min_size:
+                    continue
+
+                with open(source, "rb") as file:
+                    data = file.read()
+
+                for encoding in self.get_encodings():
+                    target = self.get_compressed_path(filename, encoding)
+                    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                        continue
+
+                    # written aside and renamed, a worker never serves a partial file
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+                    with os.fdopen(fd, "wb") as file:
+                        file.write(self.compress(data, encoding, static=True))
+                    os.replace(temp_path, target)
+                    compressed += 1
+
+        logger.info("compressed %d static assets in %s", compressed, self.static_dir)
+        return compressed
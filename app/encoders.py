@@ -1,4 +1,61 @@
+import decimal
+import uuid
+from datetime import date
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+from pydantic import BaseModel
 from pydantic.functional_validators import BeforeValidator
 from typing_extensions import Annotated
+from werkzeug.http import http_date
+
+PyObjectId = Annotated[str, BeforeValidator(str)]
+
+# datetimes are passed through to keep the http date format of the default flask provider
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+def encode_default(obj):
+    # models still go through a dict: model_dump_json would write iso datetimes instead of http dates
+    # and its keys would escape OPT_SORT_KEYS, only the stdlib encoder pass is saved
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# serializes responses straight to bytes with orjson, pydantic models included
+class OrjsonProvider(DefaultJSONProvider):
+    default = staticmethod(encode_default)
+
+    def dumps_bytes(self, obj, **kwargs) -> bytes:
+        option = ORJSON_OPTIONS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+
+        try:
+            return orjson.dumps(obj, default=encode_default, option=option)
+        except orjson.JSONEncodeError:
+            # integers over 64 bits are not supported by orjson
+            return super().dumps(obj, **kwargs).encode("utf-8")
+
+    def dumps(self, obj, **kwargs) -> str:
+        return self.dumps_bytes(obj, **kwargs).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
 
-PyObjectId = Annotated[str, BeforeValidator(str)]
\ No newline at end of file
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
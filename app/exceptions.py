@@ -16,4 +16,9 @@ class ElementNotFoundException(Exception):
 class KeyNotFoundException(Exception):
     def __init__(self):
         super().__init__("Key not found!")
-        self.message = "Key not found!"
\ No newline at end of file
+        self.message = "Key not found!"
+
+class GenerationQueueFullException(Exception):
+    def __init__(self):
+        super().__init__("Generation queue is full!")
+        self.message = "Too many generations in progress, please try again later."
\ No newline at end of file
@@ -0,0 +1,230 @@
+import logging
+import os
+import signal
+import socket
+import threading
+from datetime import datetime, timezone, timedelta
+from enum import Enum
+
+from bson import ObjectId
+from flask import Flask
+from pymongo import ReturnDocument
+
+from app.exceptions import GenerationQueueFullException
+from app.models import Collections
+from app.wrappers import MongoWrapper
+
+logger = logging.getLogger(__name__)
+
+class GenerationTaskStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    ERROR = "error"
+
+# tasks are stored in mongo and claimed with a lease: a task held by a dead worker
+# is claimed again by another worker once its lease expires
+class GenerationExecutor:
+    def __init__(self, mongo: MongoWrapper):
+        self.mongo = mongo
+        self.app = None
+        self.handlers = {}
+        self.workers = []
+        self.current = threading.local()
+        self.stop_event = threading.Event()
+        self.max_queue_size = None
+        self.max_attempts = None
+        self.lease = None
+        self.poll_interval = None
+
+    def init_app(self, app: Flask):
+        self.app = app
+        self.max_queue_size = app.config["GENERATION_QUEUE_MAX_SIZE"]
+        self.max_attempts = app.config["GENERATION_TASK_MAX_ATTEMPTS"]
+        self.lease = timedelta(seconds=app.config["GENERATION_TASK_LEASE_SECONDS"])
+        self.poll_interval = app.config["GENERATION_POLL_INTERVAL_SECONDS"]
+
+    def get_collection(self):
+        return self.mongo.get_collection(Collections.GENERATION_TASKS)
+
+    def task(self, name: str):
+        def decorator(fn):
+            self.handlers[name] = fn
+            return fn
+        return decorator
+
+    def count_in_progress(self) -> int:
+        return self.get_collection().count_documents(
+            {"status": {"$in": [GenerationTaskStatus.PENDING.name, GenerationTaskStatus.RUNNING.name]}}
+        )
+
+    def check_admission(self):
+        if self.count_in_progress() >= self.max_queue_size:
+            raise GenerationQueueFullException()
+
+    def submit(self, name: str, admission: bool = True, **payload) -> ObjectId:
+        if name not in self.handlers:
+            raise RuntimeError(f"no handler registered for task {name}")
+
+        if admission:
+            self.check_admission()
+
+        now = datetime.now(timezone.utc)
+        result = self.get_collection().insert_one({
+            "name": name,
+            "payload": payload,
+            "status": GenerationTaskStatus.PENDING.name,
+            "attempts": 0,
+            "available_at": now,
+            "locked_until": None,
+            "worker": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        })
+        logger.info("submitted task %s with id %s", name, result.inserted_id)
+
+        return result.inserted_id
+
+    def claim(self, worker_name: str):
+        now = datetime.now(timezone.utc)
+        self.expire_exhausted(now)
+
+        return self.get_collection().find_one_and_update(
+            {
+                "$or": [
+                    {"status": GenerationTaskStatus.PENDING.name, "available_at": {"$lte": now}},
+                    {
+                        "status": GenerationTaskStatus.RUNNING.name,
+                        "locked_until": {"$lt": now},
+                        "attempts": {"$lt": self.max_attempts}
+                    }
+                ]
+            },
+            {
+                "$set": {
+                    "status": GenerationTaskStatus.RUNNING.name,
+                    "locked_until": now + self.lease,
+                    "worker": worker_name,
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("available_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    # a task whose worker died on its last attempt is not claimed again
+    def expire_exhausted(self, now: datetime):
+        result = self.get_collection().update_many(
+            {
+                "status": GenerationTaskStatus.RUNNING.name,
+                "locked_until": {"$lt": now},
+                "attempts": {"$gte": self.max_attempts}
+            },
+            {"$set": {
+                "status": GenerationTaskStatus.ERROR.name,
+                "locked_until": None,
+                "error": "lease expired on the last attempt",
+                "updated_at": now
+            }}
+        )
+
+        if result.modified_count > 0:
+            logger.warning("marked %d tasks with no attempts left as failed", result.modified_count)
+
+    def is_last_attempt(self) -> bool:
+        task = getattr(self.current, "task", None)
+        return task is None or task["attempts"] >= self.max_attempts
+
+    def execute(self, task: dict):
+        logger.info("executing task %s with id %s (attempt %d)", task["name"], task["_id"], task["attempts"])
+        self.current.task = task
+
+        try:
+            with self.app.app_context():
+                self.handlers[task["name"]](**task["payload"])
+
+            self.complete(task)
+            logger.info("executed task %s with id %s!", task["name"], task["_id"])
+        except Exception as err:
+            logger.error("task %s with id %s failed: %s", task["name"], task["_id"], str(err))
+            self.fail(task, err)
+        finally:
+            self.current.task = None
+
+    # handlers running longer than a lease call it to keep their task from being claimed again
+    def extend_lease(self):
+        task = getattr(self.current, "task", None)
+        if task is None:
+            return
+
+        now = datetime.now(timezone.utc)
+        self.get_collection().update_one(
+            {"_id": task["_id"], "worker": task["worker"]},
+            {"$set": {"locked_until": now + self.lease, "updated_at": now}}
+        )
+
+    def complete(self, task: dict):
+        self.get_collection().update_one(
+            {"_id": task["_id"]},
+            {"$set": {
+                "status": GenerationTaskStatus.COMPLETED.name,
+                "locked_until": None,
+                "updated_at": datetime.now(timezone.utc)
+            }}
+        )
+
+    def fail(self, task: dict, err: Exception):
+        now = datetime.now(timezone.utc)
+        update = {"locked_until": None, "error": str(err), "updated_at": now}
+
+        if task["attempts"] >= self.max_attempts:
+            update["status"] = GenerationTaskStatus.ERROR.name
+        else:
+            update["status"] = GenerationTaskStatus.PENDING.name
+            update["available_at"] = now + timedelta(seconds=2 ** task["attempts"])
+
+        self.get_collection().update_one({"_id": task["_id"]}, {"$set": update})
+
+    def work(self, worker_name: str):
+        logger.info("generation worker %s started", worker_name)
+
+        while not self.stop_event.is_set():
+            try:
+                task = self.claim(worker_name)
+            except Exception as err:
+                logger.error("generation worker %s cannot claim tasks: %s", worker_name, str(err))
+                task = None
+
+            if not task:
+                self.stop_event.wait(self.poll_interval)
+                continue
+
+            self.execute(task)
+
+        logger.info("generation worker %s stopped", worker_name)
+
+    def start(self, workers: int):
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+
+        for index in range(len(self.workers), workers):
+            worker = threading.Thread(
+                target=self.work,
+                args=(f"{prefix}-{index}",),
+                name=f"generation-worker-{index}",
+                daemon=True
+            )
+            worker.start()
+            self.workers.append(worker)
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def run(self, workers: int):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.start(workers)
+        for worker in self.workers:
+            worker.join()
@@ -1,26 +1,63 @@
 from flask_apscheduler import APScheduler
 from flask_mailman import Mail
 
-from app.assistant import Assistant
-from app.wrappers import RedisWrapper, MongoWrapper, UnsplashWrapper
+from app.assistant import Assistant, AssistantCache
+from app.bloom import JtiBlocklistFilter
+from app.cache import LocalCache, DiskCache
+from app.compression import Compressor
+from app.executor import GenerationExecutor
+from app.leader import LeaderElection
+from app.mailer import MailDispatcher
+from app.outbox import MailOutbox
+from app.wrappers import RedisWrapper, MongoWrapper, UnsplashWrapper, ThreadPoolWrapper
+
+# compression
+compressor = Compressor()
 
 # mail
 mail = Mail()
+mail_dispatcher = MailDispatcher(mail)
 
 # redis
 redis_auth = RedisWrapper(db=0)
 redis_itinerary = RedisWrapper(db=2)
+redis_assistant = RedisWrapper(db=3)
+redis_scheduler = RedisWrapper(db=4)
 DAILY_EXPIRE = 60 * 60 * 24
 MOST_SAVED_ITINERARIES_KEY = "most-saved-itineraries"
 
 # mongodb
 mongo = MongoWrapper()
 
+# mail outbox
+mail_outbox = MailOutbox(mongo, mail_dispatcher)
+
+# auth
+password_update_cache = LocalCache("PASSWORD_UPDATE_CACHE_MAX_SIZE", "PASSWORD_UPDATE_CACHE_TTL_SECONDS")
+PASSWORD_UPDATE_INVALIDATION_CHANNEL = "password-update-invalidation"
+LAST_PASSWORD_UPDATE_KEY = "last-password-update:{user_id}"
+jti_blocklist = JtiBlocklistFilter(redis_auth)
+JTI_BLOCKLIST_CHANNEL = "jti-blocklist"
+
+# city meta
+city_meta_cache = LocalCache("CITY_META_CACHE_MAX_SIZE", "CITY_META_CACHE_TTL_SECONDS")
+CITY_META_INVALIDATION_CHANNEL = "city-meta-invalidation"
+
+# itinerary pdf
+pdf_cache = DiskCache("PDF_CACHE_DIR", "PDF_CACHE_MAX_BYTES")
+pdf_render_executor = ThreadPoolWrapper("PDF_RENDER_MAX_WORKERS", "pdf-render")
+
+# generation
+generation_executor = GenerationExecutor(mongo)
+
 # unsplash
 unsplash = UnsplashWrapper()
 
 # openai
-assistant = Assistant()
+assistant_cache = AssistantCache(redis_assistant)
+assistant = Assistant(cache=assistant_cache)
+itinerary_day_executor = ThreadPoolWrapper("ITINERARY_GENERATION_MAX_WORKERS", "itinerary-day")
+ITINERARY_GENERATION_DAY_ATTEMPTS = 3
 
 CITY_DESCRIPTION_USER_PROMPT = "Provide a short description of {city} city."
 CITY_DESCRIPTION_SYSTEM_INSTRUCTIONS = {
@@ -55,6 +92,17 @@ ITINERARY_USER_EVENT_PROMPT = """
 
 ITINERARY_DAILY_PROMPT = "Generate the itinerary for day {day}."
 
+ITINERARY_SKELETON_PROMPT = """
+    Plan the skeleton of the whole trip: for each of the {trip_duration} day(s) provide only the day number,
+    a title and a short theme. Do not provide any stage yet.
+"""
+
+ITINERARY_SKELETON_DAILY_PROMPT = """
+    Generate the itinerary for day {day} only, titled "{title}" with theme: {theme}.
+    The whole trip is planned as follows: {skeleton}.
+    Do not repeat activities planned for the other days.
+"""
+
 ITINERARY_RETRIEVE_DOCS_PROMPT = """
 In {month} I'm going to {city}. what should I prepare for the trip? documents, visa, vaccinations
 Format your answer in json like the following example:
@@ -176,6 +224,8 @@ ITINERARY_SYSTEM_INSTRUCTIONS = {
 
 # job
 scheduler = APScheduler()
+scheduler_leader = LeaderElection(redis_scheduler, "scheduler-leader")
+JOB_RECIPIENTS_BATCH_SIZE = 500
 JOB_NOTIFICATION_DAILY_TRAVEL_TRIGGER = "cron"
 JOB_NOTIFICATION_DAILY_TRAVEL_HOUR = 1
 JOB_NOTIFICATION_DAILY_TRAVEL_MINUTES = 34
@@ -187,4 +237,7 @@ JOB_NOTIFICATION_DOCS_REMINDER_DAYS_BEFORE_START_DATE = 15
 
 JOB_EVENT_NEWSLETTER_TRIGGER = "cron"
 JOB_EVENT_NEWSLETTER_HOUR = 22
-JOB_EVENT_NEWSLETTER_MINUTES = 38
\ No newline at end of file
+JOB_EVENT_NEWSLETTER_MINUTES = 38
+
+JOB_OUTBOX_EXPIRE_EXHAUSTED_TRIGGER = "interval"
+JOB_OUTBOX_EXPIRE_EXHAUSTED_MINUTES = 5
\ No newline at end of file
@@ -0,0 +1,141 @@
+import json
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.config import Config
+from app.extensions import mongo
+from app.models import Collections
+
+logger = logging.getLogger(__name__)
+
+# matches the deleted_at filter added by MongoWrapper.add_base_filters
+NOT_DELETED = {"deleted_at": None}
+
+INDEXES: dict[Collections, list[IndexModel]] = {
+    Collections.ADMIN_CONFIGS: [],
+    Collections.CITY_METAS: [
+        IndexModel([("key", ASCENDING)], unique=True)
+    ],
+    Collections.EVENTS: [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   partialFilterExpression=NOT_DELETED),
+        IndexModel([("related_activities", ASCENDING), ("end_date", ASCENDING)], partialFilterExpression=NOT_DELETED),
+        IndexModel([("end_date", ASCENDING)], partialFilterExpression=NOT_DELETED)
+    ],
+    Collections.GENERATION_TASKS: [
+        IndexModel([("status", ASCENDING), ("available_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("locked_until", ASCENDING)]),
+        # finished tasks are kept for a week, pending and running ones never expire
+        IndexModel([("updated_at", ASCENDING)], expireAfterSeconds=60 * 60 * 24 * 7,
+                   partialFilterExpression={"status": {"$in": ["COMPLETED", "ERROR"]}})
+    ],
+    Collections.ITINERARIES: [
+        IndexModel([("user_id", ASCENDING), ("end_date", ASCENDING)], partialFilterExpression=NOT_DELETED),
+        IndexModel([("shared_with", ASCENDING), ("end_date", ASCENDING)], partialFilterExpression=NOT_DELETED),
+        IndexModel([("shared_with", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   partialFilterExpression=NOT_DELETED),
+        IndexModel([("is_public", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   partialFilterExpression=NOT_DELETED),
+        IndexModel([("start_date", ASCENDING), ("end_date", ASCENDING)], partialFilterExpression=NOT_DELETED)
+    ],
+    Collections.ITINERARY_DOCS: [
+        IndexModel([("key", ASCENDING), ("month", ASCENDING)], unique=True)
+    ],
+    Collections.ITINERARY_EXPORTS: [
+        # completed and failed exports expire, pending and running ones have no completed_at.
+        # archives are swept from EXPORT_DIR after the same retention
+        IndexModel([("completed_at", ASCENDING)], expireAfterSeconds=Config.EXPORT_RETENTION_SECONDS)
+    ],
+    Collections.ITINERARY_METAS: [
+        IndexModel([("itinerary_id", ASCENDING)]),
+        IndexModel([("saved_by", ASCENDING)])
+    ],
+    Collections.ITINERARY_REQUESTS: [],
+    Collections.MAIL_OUTBOX: [
+        IndexModel([("status", ASCENDING), ("available_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("locked_until", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("delivered_at", DESCENDING)]),
+        # delivered and failed mails are kept for a week, pending ones have neither date and never expire
+        IndexModel([("delivered_at", ASCENDING)], expireAfterSeconds=60 * 60 * 24 * 7),
+        IndexModel([("failed_at", ASCENDING)], expireAfterSeconds=60 * 60 * 24 * 7)
+    ],
+    Collections.ORGANIZATIONS: [
+        IndexModel([("user_id", ASCENDING)], partialFilterExpression=NOT_DELETED),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   partialFilterExpression=NOT_DELETED)
+    ],
+    Collections.RESET_TOKENS: [
+        IndexModel([("token", ASCENDING)]),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)
+    ],
+    Collections.TRAVELER_SIGNUPS: [
+        IndexModel([("token", ASCENDING)])
+    ],
+    Collections.TRAVELERS: [
+        IndexModel([("user_id", ASCENDING)], partialFilterExpression=NOT_DELETED)
+    ],
+    Collections.USERS: [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("roles", ASCENDING)])
+    ]
+}
+
+# documents stored before their unique index existed, only the ones that can be fetched again are removed.
+# duplicated users are left to be merged by hand and their unique index fails to build
+DEDUPLICATED_KEYS: dict[Collections, str] = {
+    Collections.CITY_METAS: "key"
+}
+
+def remove_duplicates(collection: Collections, field: str) -> int:
+    duplicates = mongo.get_collection(collection).aggregate([
+        {"$group": {"_id": f"${field}", "oldest": {"$min": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+    removed = 0
+
+    for duplicate in duplicates:
+        result = mongo.get_collection(collection).delete_many({field: duplicate["_id"], "_id": {"$ne": duplicate["oldest"]}})
+        removed += result.deleted_count
+
+    if removed > 0:
+        logger.warning("removed %d duplicated documents by %s from collection %s", removed, field, collection.value)
+
+    return removed
+
+def ensure_indexes() -> bool:
+    logger.info("creating indexes..")
+    succeeded = True
+
+    for collection, indexes in INDEXES.items():
+        if not indexes:
+            continue
+
+        try:
+            if collection in DEDUPLICATED_KEYS:
+                remove_duplicates(collection, DEDUPLICATED_KEYS[collection])
+
+            created = mongo.get_collection(collection).create_indexes(indexes)
+            logger.info("indexes %s in place for collection %s", ','.join(created), collection.value)
+        except OperationFailure as err:
+            succeeded = False
+            logger.error("cannot create indexes for collection %s: %s", collection.value, str(err))
+
+    logger.info("indexes created!")
+    return succeeded
+
+def write_index_report(path: str):
+    with open(path, "w") as report:
+        for collection in Collections:
+            for index in mongo.get_collection(collection).list_indexes():
+                report.write(json.dumps({
+                    "collection": collection.value,
+                    "name": index.get("name"),
+                    "key": dict(index.get("key")),
+                    "unique": index.get("unique", False),
+                    "partial_filter_expression": index.get("partialFilterExpression"),
+                    "expire_after_seconds": index.get("expireAfterSeconds")
+                }, default=str) + "\n")
+
+    logger.info("index report written to %s", path)
@@ -0,0 +1,115 @@
+import functools
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from flask import Flask
+
+from app.wrappers import RedisWrapper
+
+logger = logging.getLogger(__name__)
+
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# the leader holds a redis key with a lease renewed by heartbeat: when it dies the key expires
+# and the first candidate that sets it again takes over
+class LeaderElection:
+    def __init__(self, redis: RedisWrapper, key: str):
+        self.redis = redis
+        self.key = key
+        self.identity = None
+        self.enabled = False
+        self.lease_ms = None
+        self.heartbeat_interval = None
+        self.leader = False
+        self.lease_expires_at = 0
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def init_app(self, app: Flask):
+        self.enabled = app.config["SCHEDULER_LEADER_ELECTION"]
+        self.lease_ms = app.config["SCHEDULER_LEADER_LEASE_SECONDS"] * 1000
+        self.heartbeat_interval = app.config["SCHEDULER_LEADER_HEARTBEAT_SECONDS"]
+
+    def is_leader(self) -> bool:
+        if not self.enabled:
+            return True
+
+        # a leader that could not renew its lease steps down before the key expires
+        return self.leader and time.monotonic() < self.lease_expires_at
+
+    def heartbeat(self):
+        client = self.redis.get_client()
+        renewed_at = time.monotonic()
+
+        if self.leader:
+            if client.eval(RENEW_SCRIPT, 1, self.key, self.identity, self.lease_ms) == 1:
+                self.lease_expires_at = renewed_at + self.lease_ms / 1000
+                return
+
+            self.leader = False
+            logger.warning("%s lost leadership of %s", self.identity, self.key)
+
+        if client.set(self.key, self.identity, nx=True, px=self.lease_ms):
+            self.leader = True
+            self.lease_expires_at = renewed_at + self.lease_ms / 1000
+            logger.info("%s is now leader of %s", self.identity, self.key)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.heartbeat()
+            except Exception as err:
+                logger.error("cannot renew leadership of %s: %s", self.key, str(err))
+
+            self.stop_event.wait(self.heartbeat_interval)
+
+    def start(self):
+        if not self.enabled or self.thread:
+            return
+
+        # built on start, a preloaded app is forked after being created
+        self.identity = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name=f"leader-election-{self.key}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.thread:
+            return
+
+        self.stop_event.set()
+        self.thread = None
+
+        try:
+            self.redis.get_client().eval(RELEASE_SCRIPT, 1, self.key, self.identity)
+        except Exception as err:
+            logger.error("cannot release leadership of %s: %s", self.key, str(err))
+
+        self.leader = False
+
+    def leader_only(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.is_leader():
+                logger.info("skipping %s, %s is not the leader", fn.__name__, self.identity)
+                return None
+
+            return fn(*args, **kwargs)
+
+        return wrapper
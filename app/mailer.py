@@ -0,0 +1,145 @@
+import logging
+import smtplib
+import threading
+import time
+
+from flask import Flask
+from flask_mailman import Mail, EmailMessage
+
+from app.wrappers import ThreadPoolWrapper
+
+logger = logging.getLogger(__name__)
+
+# refused by the server for this message only, the connection is still usable and a retry fails again
+def is_rejected(err: Exception) -> bool:
+    if isinstance(err, smtplib.SMTPRecipientsRefused):
+        return True
+
+    return isinstance(err, (smtplib.SMTPSenderRefused, smtplib.SMTPDataError)) and err.smtp_code >= 500
+
+class MailBatch:
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+        self.messages = []
+        self.futures = []
+
+    def add(self, message: EmailMessage):
+        self.messages.append(message)
+
+        if len(self.messages) >= self.dispatcher.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.messages:
+            return
+
+        self.futures.append(self.dispatcher.submit(self.messages))
+        self.messages = []
+
+    def wait(self) -> int:
+        self.flush()
+        sent = 0
+
+        for future in self.futures:
+            try:
+                sent += future.result()
+            except Exception as err:
+                logger.error("cannot send mail batch: %s", str(err))
+
+        return sent
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        sent = self.wait()
+        logger.info("sent %d mails", sent)
+
+# every sender thread keeps its own smtp connection open across batches,
+# a broken connection is reopened and the batch resumes from the first unsent message
+class MailDispatcher:
+    def __init__(self, mail: Mail):
+        self.mail = mail
+        self.app = None
+        self.senders = ThreadPoolWrapper("MAIL_SENDER_POOL_SIZE", "mail-sender")
+        self.connections = threading.local()
+        self.in_flight = None
+        self.batch_size = None
+        self.attempts = None
+
+    def init_app(self, app: Flask):
+        self.app = app
+        self.senders.init_app(app)
+        self.batch_size = app.config["MAIL_BATCH_SIZE"]
+        self.attempts = app.config["MAIL_SEND_ATTEMPTS"]
+        # bounds the rendered messages waiting for a sender
+        self.in_flight = threading.BoundedSemaphore(app.config["MAIL_SENDER_POOL_SIZE"] * 2)
+
+    def get_connection(self):
+        connection = getattr(self.connections, "connection", None)
+
+        if connection is None:
+            connection = self.mail.get_connection(fail_silently=False)
+            connection.open()
+            self.connections.connection = connection
+
+        return connection
+
+    def close_connection(self):
+        connection = getattr(self.connections, "connection", None)
+        self.connections.connection = None
+
+        if connection is None:
+            return
+
+        try:
+            connection.close()
+        except Exception as err:
+            logger.warning("cannot close smtp connection: %s", str(err))
+
+    def send_messages(self, messages: list[EmailMessage], skip_rejected: bool = True) -> int:
+        index = 0
+        sent = 0
+        attempt = 1
+
+        with self.app.app_context():
+            while index < len(messages):
+                try:
+                    sent += self.get_connection().send_messages(messages[index:index + 1])
+                    index += 1
+                    attempt = 1
+                except Exception as err:
+                    # a rejected mail is skipped, the rest of the batch is still sent
+                    if skip_rejected and is_rejected(err):
+                        logger.error("mail to %s rejected, skipping it: %s", ','.join(messages[index].to), str(err))
+                        index += 1
+                        continue
+
+                    self.close_connection()
+
+                    if attempt >= self.attempts:
+                        raise
+
+                    logger.warning("smtp error after %d mails sent: %s, reconnecting..", index, str(err))
+                    time.sleep(2 ** attempt)
+                    attempt += 1
+
+        return sent
+
+    def submit(self, messages: list[EmailMessage]):
+        self.in_flight.acquire()
+
+        try:
+            future = self.senders.get_executor().submit(self.send_messages, messages)
+        except Exception:
+            self.in_flight.release()
+            raise
+
+        future.add_done_callback(lambda _: self.in_flight.release())
+        return future
+
+    def send(self, message: EmailMessage):
+        self.send_messages([message], skip_rejected=False)
+
+    def batch(self) -> MailBatch:
+        return MailBatch(self)
@@ -1,17 +1,25 @@
+import json
 import math
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import datetime
 from enum import Enum
 
-from pydantic import BaseModel, Field, computed_field
+from bson import ObjectId
+from pydantic import BaseModel, Field, computed_field, field_validator
 from typing_extensions import Optional
 
 
 class Collections(Enum):
     ADMIN_CONFIGS = "admin_configs"
     EVENTS = "events"
+    GENERATION_TASKS = "generation_tasks"
     CITY_METAS = "city_metas"
     ITINERARIES = "itineraries"
+    ITINERARY_DOCS = "itinerary_docs"
+    ITINERARY_EXPORTS = "itinerary_exports"
     ITINERARY_METAS = "itinerary_metas"
     ITINERARY_REQUESTS = "itinerary_requests"
+    MAIL_OUTBOX = "mail_outbox"
     ORGANIZATIONS = "organizations"
     RESET_TOKENS = "reset_tokens"
     TRAVELER_SIGNUPS = "traveler_signups"
@@ -63,3 +71,42 @@ class PaginatedResponse(BaseModel):
     @property
     def total_pages(self) -> int:
         return math.ceil(self.total_elements/self.page_size)
+
+
+class CursorPaginated(BaseModel):
+    cursor: Optional[str] = None
+    page_size: int = Field(default=10, le=10)
+
+    @field_validator("cursor")
+    @classmethod
+    def check_cursor(cls, cursor: Optional[str]) -> Optional[str]:
+        if cursor:
+            CursorPaginated.decode_cursor(cursor)
+
+        return cursor
+
+    # older documents have no created_at, their cursor keeps a null position
+    @staticmethod
+    def encode_cursor(document: dict) -> str:
+        created_at = document.get("created_at")
+        position = [created_at.isoformat() if created_at else None, str(document["_id"])]
+        return urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[Optional[datetime], ObjectId]:
+        try:
+            created_at, document_id = json.loads(urlsafe_b64decode(cursor.encode("ascii")))
+            return datetime.fromisoformat(created_at) if created_at else None, ObjectId(document_id)
+        except Exception:
+            raise ValueError("Invalid cursor!")
+
+    def get_position(self) -> Optional[tuple[Optional[datetime], ObjectId]]:
+        if not self.cursor:
+            return None
+
+        return CursorPaginated.decode_cursor(self.cursor)
+
+class CursorPaginatedResponse(BaseModel):
+    content: list[dict]
+    page_size: int
+    next_cursor: Optional[str] = None
@@ -0,0 +1,213 @@
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timezone, timedelta
+from enum import Enum
+
+from bson import ObjectId
+from flask import Flask
+from flask_mailman import EmailMessage
+from pymongo import ReturnDocument
+
+from app.mailer import MailDispatcher
+from app.models import Collections
+from app.wrappers import MongoWrapper
+
+logger = logging.getLogger(__name__)
+
+class OutboxStatus(Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    DELIVERED = "delivered"
+    ERROR = "error"
+
+# mails are stored already rendered and delivered by worker threads, the caller never waits for smtp.
+# a mail claimed by a dead worker is claimed again once its lease expires
+class MailOutbox:
+    LATENCY_SAMPLE_SIZE = 1000
+
+    def __init__(self, mongo: MongoWrapper, dispatcher: MailDispatcher):
+        self.mongo = mongo
+        self.dispatcher = dispatcher
+        self.workers = []
+        self.stop_event = threading.Event()
+        self.max_attempts = None
+        self.lease = None
+        self.poll_interval = None
+
+    def init_app(self, app: Flask):
+        self.max_attempts = app.config["OUTBOX_MAX_ATTEMPTS"]
+        self.lease = timedelta(seconds=app.config["OUTBOX_LEASE_SECONDS"])
+        self.poll_interval = app.config["OUTBOX_POLL_INTERVAL_SECONDS"]
+
+    def get_collection(self):
+        return self.mongo.get_collection(Collections.MAIL_OUTBOX)
+
+    def enqueue(self, message: EmailMessage) -> ObjectId:
+        now = datetime.now(timezone.utc)
+        result = self.get_collection().insert_one({
+            "subject": message.subject,
+            "body": message.body,
+            "to": message.to,
+            "from_email": message.from_email,
+            "content_subtype": message.content_subtype,
+            "status": OutboxStatus.PENDING.name,
+            "attempts": 0,
+            "available_at": now,
+            "locked_until": None,
+            "error": None,
+            "created_at": now,
+            "delivered_at": None,
+            "failed_at": None
+        })
+        logger.info("mail %s queued in outbox with id %s", message.subject, result.inserted_id)
+
+        return result.inserted_id
+
+    def claim(self):
+        now = datetime.now(timezone.utc)
+
+        return self.get_collection().find_one_and_update(
+            {
+                "$or": [
+                    {"status": OutboxStatus.PENDING.name, "available_at": {"$lte": now}},
+                    {
+                        "status": OutboxStatus.SENDING.name,
+                        "locked_until": {"$lt": now},
+                        "attempts": {"$lt": self.max_attempts}
+                    }
+                ]
+            },
+            {
+                "$set": {"status": OutboxStatus.SENDING.name, "locked_until": now + self.lease},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("available_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    # a mail whose worker died or timed out on its last attempt is not claimed and sent again
+    def expire_exhausted(self):
+        now = datetime.now(timezone.utc)
+        result = self.get_collection().update_many(
+            {
+                "status": OutboxStatus.SENDING.name,
+                "locked_until": {"$lt": now},
+                "attempts": {"$gte": self.max_attempts}
+            },
+            {"$set": {
+                "status": OutboxStatus.ERROR.name,
+                "locked_until": None,
+                "error": "lease expired on the last attempt",
+                "failed_at": now
+            }}
+        )
+
+        if result.modified_count > 0:
+            logger.warning("marked %d mails with no attempts left as failed", result.modified_count)
+
+    @staticmethod
+    def to_message(record: dict) -> EmailMessage:
+        message = EmailMessage(
+            subject=record["subject"],
+            body=record["body"],
+            to=record["to"],
+            from_email=record["from_email"]
+        )
+        message.content_subtype = record["content_subtype"]
+        return message
+
+    def deliver(self, record: dict):
+        try:
+            self.dispatcher.send(self.to_message(record))
+        except Exception as err:
+            logger.error("cannot deliver mail with id %s (attempt %d): %s", record["_id"], record["attempts"], str(err))
+            self.fail(record, err)
+            return
+
+        self.get_collection().update_one(
+            {"_id": record["_id"]},
+            {"$set": {
+                "status": OutboxStatus.DELIVERED.name,
+                "locked_until": None,
+                "error": None,
+                "delivered_at": datetime.now(timezone.utc)
+            }}
+        )
+        logger.info("delivered mail with id %s", record["_id"])
+
+    def fail(self, record: dict, err: Exception):
+        now = datetime.now(timezone.utc)
+        update = {"locked_until": None, "error": str(err)}
+
+        if record["attempts"] >= self.max_attempts:
+            update["status"] = OutboxStatus.ERROR.name
+            update["failed_at"] = now
+        else:
+            update["status"] = OutboxStatus.PENDING.name
+            update["available_at"] = now + timedelta(seconds=2 ** record["attempts"] * 30)
+
+        self.get_collection().update_one({"_id": record["_id"]}, {"$set": update})
+
+    def work(self, worker_name: str):
+        logger.info("outbox worker %s started", worker_name)
+
+        while not self.stop_event.is_set():
+            try:
+                record = self.claim()
+            except Exception as err:
+                logger.error("outbox worker %s cannot claim mails: %s", worker_name, str(err))
+                record = None
+
+            if not record:
+                self.stop_event.wait(self.poll_interval)
+                continue
+
+            self.deliver(record)
+
+        logger.info("outbox worker %s stopped", worker_name)
+
+    def start(self, workers: int):
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+
+        for index in range(len(self.workers), workers):
+            worker = threading.Thread(
+                target=self.work,
+                args=(f"{prefix}-{index}",),
+                name=f"outbox-worker-{index}",
+                daemon=True
+            )
+            worker.start()
+            self.workers.append(worker)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def stats(self) -> dict:
+        collection = self.get_collection()
+        now = datetime.now(timezone.utc)
+
+        oldest_pending = collection.find_one(
+            {"status": {"$in": [OutboxStatus.PENDING.name, OutboxStatus.SENDING.name]}},
+            {"created_at": 1},
+            sort=[("created_at", 1)]
+        )
+        latencies = list(collection.aggregate([
+            {"$match": {"status": OutboxStatus.DELIVERED.name}},
+            {"$sort": {"delivered_at": -1}},
+            {"$limit": self.LATENCY_SAMPLE_SIZE},
+            {"$project": {"latency": {"$subtract": ["$delivered_at", "$created_at"]}}},
+            {"$sort": {"latency": 1}}
+        ]))
+        latencies = [record["latency"] / 1000 for record in latencies]
+
+        return {
+            "pending": collection.count_documents({"status": OutboxStatus.PENDING.name}),
+            "sending": collection.count_documents({"status": OutboxStatus.SENDING.name}),
+            "error": collection.count_documents({"status": OutboxStatus.ERROR.name}),
+            "oldest_pending_seconds": (now - oldest_pending["created_at"].replace(tzinfo=timezone.utc)).total_seconds()
+                if oldest_pending else 0,
+            "delivery_latency_avg_seconds": sum(latencies) / len(latencies) if latencies else 0,
+            "delivery_latency_p95_seconds": latencies[int(len(latencies) * 0.95)] if latencies else 0
+        }
@@ -1,3 +1,6 @@
+import os
+import threading
+from io import BytesIO
 from typing import Final
 
 from reportlab.lib import colors
@@ -8,16 +11,42 @@ from reportlab.pdfgen.canvas import Canvas
 from reportlab.platypus import Table, TableStyle, Paragraph
 
 
+# bump it when the layout changes, cached pdfs rendered with the previous one are not served anymore
+LAYOUT_VERSION: Final = 1
+FONT_DIR = os.path.join(os.path.dirname(__file__), "static", "font")
+FONT_STYLES = ["Thin", "ExtraLight", "Light", "Regular", "Medium", "SemiBold", "Bold", "ExtraBold", "Black"]
+fonts_lock = threading.Lock()
+fonts_registered = False
+
+# registered fonts are process wide in reportlab, parsing them once is enough for every canvas
 def register_font_style():
-    pdfmetrics.registerFont(TTFont("Outfit-Thin", "app/static/font/Outfit-Thin.ttf"))
-    pdfmetrics.registerFont(TTFont("Outfit-ExtraLight", "app/static/font/Outfit-ExtraLight.ttf"))
-    pdfmetrics.registerFont(TTFont("Outfit-Light", "app/static/font/Outfit-Light.ttf"))
-    pdfmetrics.registerFont(TTFont("Outfit-Regular", "app/static/font/Outfit-Regular.ttf"))
-    pdfmetrics.registerFont(TTFont("Outfit-Medium", "app/static/font/Outfit-Medium.ttf"))
-    pdfmetrics.registerFont(TTFont("Outfit-SemiBold", "app/static/font/Outfit-SemiBold.ttf"))
-    pdfmetrics.registerFont(TTFont("Outfit-Bold", "app/static/font/Outfit-Bold.ttf"))
-    pdfmetrics.registerFont(TTFont("Outfit-ExtraBold", "app/static/font/Outfit-ExtraBold.ttf"))
-    pdfmetrics.registerFont(TTFont("Outfit-Black", "app/static/font/Outfit-Black.ttf"))
+    global fonts_registered
+
+    if fonts_registered:
+        return
+
+    with fonts_lock:
+        if fonts_registered:
+            return
+
+        for style in FONT_STYLES:
+            pdfmetrics.registerFont(TTFont(f"Outfit-{style}", os.path.join(FONT_DIR, f"Outfit-{style}.ttf")))
+
+        fonts_registered = True
+
+def render_itinerary(itinerary) -> BytesIO:
+    buffer = BytesIO()
+    doc = PdfItinerary(buffer)
+    doc.draw_header(itinerary)
+    doc.draw_itinerary_information(itinerary)
+    doc.draw_days_itinerary(itinerary)
+    doc.save()
+    buffer.seek(0)
+    return buffer
+
+# module level so that it can be run on a process pool
+def render_itinerary_bytes(itinerary) -> bytes:
+    return render_itinerary(itinerary).getvalue()
 
 
 class PdfItinerary(Canvas):
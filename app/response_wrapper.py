@@ -1,14 +1,32 @@
 from datetime import datetime
 
-from flask import jsonify
+from flask import jsonify, make_response, request
 
 
-def success_response(response, code=200):
-    return jsonify({
+# pydantic models can be passed as they are, the app json provider serializes them
+def success_response(response, code=200, etag: str = None):
+    json_response = jsonify({
         "status": "SUCCESS",
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "response": response
-    }), code
+    })
+
+    if etag:
+        json_response.set_etag(etag)
+        # cached copies are always revalidated with If-None-Match
+        json_response.cache_control.no_cache = True
+
+    return json_response, code
+
+def is_not_modified(etag: str) -> bool:
+    return etag is not None and request.if_none_match.contains_weak(etag)
+
+def not_modified_response(etag: str, code=304):
+    response = make_response("", code)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+
+    return response
 
 def error_response(code=500):
     return jsonify({
@@ -64,6 +82,13 @@ def bad_gateway_response(code=502):
         "response": "External service returned with an error. Please try again later."
     }), code
 
+def too_many_requests_response(response, code=429):
+    return jsonify({
+        "status": "FAILURE",
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "response": response
+    }), code
+
 def service_unavailable_response(code=503):
     return jsonify({
         "status": "FAILURE",
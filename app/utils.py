@@ -1,5 +1,15 @@
+import hashlib
+
+
 def is_valid_enum_name(enum_class, name: str) -> bool:
     return name in enum_class.__members__
 
 def encode_city_name(name: str):
-    return name.lower().replace(' ', '_')
\ No newline at end of file
+    return name.strip().lower().replace(' ', '_')
+
+# city names typed by users differ in case and spacing, prompts use one spelling so the assistant cache is shared
+def normalize_city_name(name: str) -> str:
+    return name.strip().casefold()
+
+def build_etag(*parts) -> str:
+    return hashlib.sha1(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
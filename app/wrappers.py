@@ -1,9 +1,18 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from flask import Flask
 from pymongo import MongoClient
 from redis import Redis
 
-from app.models import Collections, UnsplashImage
+from app.cache import LocalCache
+from app.models import Collections, UnsplashImage, CursorPaginated, Paginated
+
+logger = logging.getLogger(__name__)
 
 
 class UnsplashWrapper:
@@ -45,14 +54,75 @@ class RedisWrapper:
 
         return self.client
 
+    def publish(self, channel: str, message: str):
+        self.get_client().publish(channel, message)
+
+    def subscribe(self, channel: str, handler, on_subscribe=None):
+        threading.Thread(
+            target=self.listen,
+            args=(channel, handler, on_subscribe),
+            name=f"redis-subscriber-{channel}",
+            daemon=True
+        ).start()
+
+    def listen(self, channel: str, handler, on_subscribe=None):
+        while True:
+            try:
+                pubsub = self.get_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                logger.info("subscribed to channel %s", channel)
+
+                # messages published while not subscribed are lost
+                if on_subscribe:
+                    on_subscribe()
+
+                for message in pubsub.listen():
+                    handler(message["data"])
+            except Exception as err:
+                logger.error("subscription to channel %s lost: %s, retrying..", channel, str(err))
+                time.sleep(1)
+
+    def single_flight(self, key: str, lookup, compute, lock_timeout: int = 120, blocking_timeout: int = 150):
+        result = lookup()
+        if result is not None:
+            return result
+
+        # only the lock owner computes the result, waiters find it with the second lookup
+        with self.get_client().lock(f"single-flight:{key}", timeout=lock_timeout, blocking_timeout=blocking_timeout):
+            result = lookup()
+            if result is not None:
+                return result
+
+            return compute()
+
+class ThreadPoolWrapper:
+    def __init__(self, max_workers_config: str, thread_name_prefix: str):
+        self.executor = None
+        self.max_workers_config = max_workers_config
+        self.thread_name_prefix = thread_name_prefix
+
+    def init_app(self, app: Flask):
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config[self.max_workers_config],
+            thread_name_prefix=self.thread_name_prefix
+        )
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        if not self.executor:
+            raise RuntimeError("no instance provided for thread pool executor")
+
+        return self.executor
+
 class MongoWrapper:
     def __init__(self):
         self.client = None
         self.db = None
+        self.totals = LocalCache("PAGINATION_TOTAL_CACHE_MAX_SIZE", "PAGINATION_TOTAL_CACHE_TTL_SECONDS")
 
     def init_app(self, app: Flask):
         self.client = MongoClient(app.config["MONGO_URI"])
         self.db = app.config["MONGO_DATABASE"]
+        self.totals.init_app(app)
 
     def get_client(self) -> MongoClient:
         if not self.client:
@@ -86,9 +156,9 @@ class MongoWrapper:
     def insert_one(self, collection, obj: dict):
         return self.get_collection(collection).insert_one(obj)
 
-    def update_one(self, collection, filters: dict, update: dict):
+    def update_one(self, collection, filters: dict, update: dict, upsert: bool = False):
         self.add_base_filters(filters)
-        return self.get_collection(collection).update_one(filters, update)
+        return self.get_collection(collection).update_one(filters, update, upsert=upsert)
 
     def delete_one(self, collection, filters: dict):
         return self.get_collection(collection).delete_one(filters)
@@ -104,6 +174,68 @@ class MongoWrapper:
     def aggregate(self, collection, filters: dict, aggregations: list[dict]):
         return self.get_collection(collection).aggregate([self.build_match(filters)] + aggregations)
 
+    def paginate(self,
+                 collection,
+                 filters: dict,
+                 pipeline: list[dict],
+                 paginated: Paginated,
+                 cache_total: bool = False) -> tuple[list[dict], int]:
+        # page and total come from a single $facet, the pipeline is applied to the page only.
+        # a cached total skips the count until it expires
+        self.add_base_filters(filters)
+
+        stages = [
+            self.build_match(filters),
+            {"$sort": {"created_at": -1}}
+        ]
+        content = [{"$skip": paginated.elements_to_skip}, {"$limit": paginated.page_size}] + pipeline
+
+        total_key = None
+        total = None
+        if cache_total:
+            total_key = f"{self.decode_collection(collection)}:{json.dumps(filters, sort_keys=True, default=str)}"
+            total = self.totals.get(total_key)
+
+        if total is not None:
+            return list(self.get_collection(collection).aggregate(stages + content)), total
+
+        result = next(self.get_collection(collection).aggregate(
+            stages + [{"$facet": {"content": content, "total": [{"$count": "count"}]}}]
+        ))
+        documents = result["content"]
+        total = result["total"][0]["count"] if result["total"] else 0
+
+        if total_key:
+            self.totals.set(total_key, total)
+
+        return documents, total
+
+    def aggregate_by_cursor(self, collection, filters: dict, aggregations: list[dict], cursor_paginated: CursorPaginated):
+        position = cursor_paginated.get_position()
+
+        # documents without created_at sort last, after every dated one
+        if position:
+            created_at, document_id = position
+            after = [{"created_at": created_at, "_id": {"$lt": document_id}}]
+            if created_at is not None:
+                after += [{"created_at": {"$lt": created_at}}, {"created_at": None}]
+
+            filters = {"$and": [filters, {"$or": after}]}
+
+        # one element more than the page size tells whether a next page exists,
+        # the aggregations must keep created_at to build the next cursor
+        documents = list(self.aggregate(
+            collection,
+            filters,
+            [{"$sort": {"created_at": -1, "_id": -1}}, {"$limit": cursor_paginated.page_size + 1}] + aggregations
+        ))
+
+        if len(documents) <= cursor_paginated.page_size:
+            return documents, None
+
+        documents = documents[:cursor_paginated.page_size]
+        return documents, CursorPaginated.encode_cursor(documents[-1])
+
     def build_match(self, filters: dict):
         self.add_base_filters(filters)
         return {"$match": filters}
@@ -0,0 +1,99 @@
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app import create_app
+from app.blueprints.itinerary.service import invalidate_itinerary_pdf
+from app.extensions import mongo
+from app.models import Collections
+
+# downloads a pdf through /v1/itinerary/download/<itinerary_id> with the flask test client: mongo, the disk cache,
+# send_file and the etag are all in the path. needs the mongo of the app, the itinerary is removed at the end.
+# run it from the project root with `python -m benchmarks.pdf_download`
+
+def build_itinerary_document(days: int, stages: int) -> dict:
+    start_date = datetime(2025, 6, 1)
+
+    return {
+        "city": "Roma",
+        "start_date": start_date,
+        "end_date": start_date + timedelta(days=days - 1),
+        "details": [
+            {
+                "day": day,
+                "title": f"Day {day}",
+                "stages": [
+                    {
+                        "period": "Morning" if stage % 2 == 0 else "Afternoon",
+                        "title": f"Stage {stage} of day {day}",
+                        "description": "Walk around the historical center and visit the main monuments. " * 3,
+                        "cost": "10",
+                        "accessible": True,
+                        "coordinates": {"lat": 41.9, "lng": 12.5},
+                        "avg_duration": 90
+                    }
+                    for stage in range(stages)
+                ]
+            }
+            for day in range(1, days + 1)
+        ],
+        "created_at": datetime.now()
+    }
+
+def measure(fn, runs: int, before=None) -> list[float]:
+    timings = []
+
+    for _ in range(runs):
+        if before:
+            before()
+
+        started_at = time.perf_counter()
+        response = fn()
+        timings.append((time.perf_counter() - started_at) * 1000)
+
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"download failed with status {response.status_code}")
+
+    return timings
+
+def describe(name: str, timings: list[float]):
+    print(f"{name} over {len(timings)} runs: "
+          f"mean {statistics.mean(timings):.2f} ms, "
+          f"median {statistics.median(timings):.2f} ms, "
+          f"p95 {sorted(timings)[int(len(timings) * 0.95)]:.2f} ms, "
+          f"max {max(timings):.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="pdf download benchmark")
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--stages", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app({"BOOTSTRAP_ON_STARTUP": False, "START_BACKGROUND_SERVICES": False})
+    client = app.test_client()
+    inserted_id = mongo.insert_one(Collections.ITINERARIES, build_itinerary_document(args.days, args.stages)).inserted_id
+    itinerary_id = str(inserted_id)
+    url = f"/v1/itinerary/download/{itinerary_id}"
+
+    try:
+        # cold: the cached pdf is dropped before every download, which renders and stores it again
+        cold_timings = measure(lambda: client.get(url), args.runs, before=lambda: invalidate_itinerary_pdf(itinerary_id))
+
+        response = client.get(url)
+        size = len(response.data)
+        etag = response.headers["ETag"]
+        warm_timings = measure(lambda: client.get(url), args.runs)
+        not_modified_timings = measure(lambda: client.get(url, headers={"If-None-Match": etag}), args.runs)
+
+        print(f"itinerary: {args.days} days, {args.stages} stages per day, pdf size {size} bytes")
+        describe("cold download (render)", cold_timings)
+        describe("warm download (disk cache)", warm_timings)
+        describe("conditional download (304)", not_modified_timings)
+    finally:
+        invalidate_itinerary_pdf(itinerary_id)
+        mongo.delete_one(Collections.ITINERARIES, {"_id": inserted_id})
+
+if __name__ == '__main__':
+    main()
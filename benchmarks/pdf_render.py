@@ -0,0 +1,71 @@
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.pdf import register_font_style, render_itinerary
+
+# render only: times reportlab on the pdf served by /itinerary/download/<itinerary_id>, without mongo, the disk cache
+# or http in between. benchmarks.pdf_download measures the endpoint itself.
+# run it from the project root with `python -m benchmarks.pdf_render`
+
+def build_itinerary(days: int, stages: int):
+    start_date = datetime(2025, 6, 1)
+
+    return SimpleNamespace(
+        city="Roma",
+        start_date=start_date,
+        end_date=start_date + timedelta(days=days - 1),
+        details=[
+            SimpleNamespace(
+                day=day,
+                title=f"Day {day}",
+                stages=[
+                    SimpleNamespace(
+                        period="Morning" if stage % 2 == 0 else "Afternoon",
+                        title=f"Stage {stage} of day {day}",
+                        description="Walk around the historical center and visit the main monuments. " * 3,
+                        avg_duration=90
+                    )
+                    for stage in range(stages)
+                ]
+            )
+            for day in range(1, days + 1)
+        ]
+    )
+
+def measure(fn, runs: int) -> list[float]:
+    timings = []
+
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started_at) * 1000)
+
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="pdf render microbenchmark")
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--stages", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    itinerary = build_itinerary(args.days, args.stages)
+
+    font_timings = measure(register_font_style, 1)
+    render_timings = measure(lambda: render_itinerary(itinerary), args.runs)
+    size = len(render_itinerary(itinerary).getvalue())
+
+    print(f"itinerary: {args.days} days, {args.stages} stages per day, pdf size {size} bytes")
+    print(f"font registration (once per process): {font_timings[0]:.2f} ms")
+    print(f"first render: {render_timings[0]:.2f} ms")
+    print(f"render over {args.runs} runs: "
+          f"mean {statistics.mean(render_timings):.2f} ms, "
+          f"median {statistics.median(render_timings):.2f} ms, "
+          f"p95 {sorted(render_timings)[int(len(render_timings) * 0.95)]:.2f} ms, "
+          f"max {max(render_timings):.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import fcntl
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+wsgi_app = "wsgi:app"
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+accesslog = "-"
+errorlog = "-"
+
+# app, templates and fonts are loaded once in the master and shared with the workers
+preload_app = True
+
+SCHEDULER_LOCK_FILE = os.getenv("SCHEDULER_LOCK_FILE", "/tmp/easytravel-scheduler.lock")
+scheduler_lock = None
+
+def acquire_scheduler_lock() -> bool:
+    global scheduler_lock
+
+    # the lock is released by the os when the holding worker exits, its replacement takes it over
+    lock_file = open(SCHEDULER_LOCK_FILE, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+
+    scheduler_lock = lock_file
+    return True
+
+def post_fork(server, worker):
+    from app import start_background_services
+    from app.extensions import mongo
+    from wsgi import app
+
+    # mongo clients are not fork safe, each worker opens its own
+    mongo.init_app(app)
+
+    scheduler = acquire_scheduler_lock()
+    if scheduler:
+        server.log.info("worker %s runs the scheduler", worker.pid)
+
+    start_background_services(app, scheduler=scheduler)
+
+def worker_exit(server, worker):
+    from app.extensions import scheduler_leader
+
+    # lets another scheduler take over without waiting for the lease to expire
+    scheduler_leader.stop()
@@ -0,0 +1,19 @@
+import signal
+import threading
+
+from app import create_app, init_scheduler, init_cache_invalidation
+from app.extensions import scheduler, scheduler_leader
+
+app = create_app({"BOOTSTRAP_ON_STARTUP": False, "START_BACKGROUND_SERVICES": False, "SCHEDULER_ENABLED": True})
+
+if __name__ == '__main__':
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *args: stop_event.set())
+
+    init_cache_invalidation(app)
+    init_scheduler(app)
+    stop_event.wait()
+
+    scheduler.shutdown()
+    scheduler_leader.stop()
@@ -0,0 +1,12 @@
+from app import create_app
+from app.extensions import generation_executor
+
+# export renders are spawned processes importing this module again, only the worker itself creates the app
+if __name__ == '__main__':
+    app = create_app({
+        "BOOTSTRAP_ON_STARTUP": False,
+        "START_BACKGROUND_SERVICES": True,
+        "SCHEDULER_ENABLED": False,
+        "GENERATION_WORKERS": 0
+    })
+    generation_executor.run(app.config["GENERATION_WORKER_CONCURRENCY"])
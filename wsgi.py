@@ -0,0 +1,5 @@
+from app import create_app, warm_up
+
+# loaded once by the gunicorn master, background services are started in each worker by gunicorn.conf.py
+app = create_app({"START_BACKGROUND_SERVICES": False})
+warm_up(app)